@@ -1,8 +1,49 @@
-from flask import Blueprint, request, jsonify, Response
+import json
+import os
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from database import bulk
+from database.join import join
 from database.db_manager import DatabaseManager
+from database.partition import PartitionedTable
+from database.replication import Follower, ReplicationLog
 
 api = Blueprint('api', __name__)
-db_manager = DatabaseManager()
+db_manager = DatabaseManager(os.environ.get('DB_STORE_PATH', 'db_store.pkl'))
+
+# Replication is configured through the environment:
+#   DB_REPLICATION_ROLE=leader|follower  DB_REPLICATION_DIR=<shared directory>
+# It starts when this module is imported, so import it in exactly one process per store:
+# app.py turns the Werkzeug reloader off when a role is set.
+replication_role = os.environ.get('DB_REPLICATION_ROLE')
+replication_dir = os.environ.get('DB_REPLICATION_DIR', 'replication')
+replication = None
+if replication_role == 'leader':
+    replication = ReplicationLog(replication_dir)
+    db_manager.enable_replication(replication)
+elif replication_role == 'follower':
+    replication = Follower(db_manager, replication_dir,
+                           max_lag=int(os.environ.get('DB_REPLICATION_MAX_LAG', 10000)))
+    replication.start()
+
+# Endpoints that modify data; followers reject them
+WRITE_ENDPOINTS = {
+    'api.create_database', 'api.delete_database', 'api.create_table', 'api.delete_table',
+    'api.create_record', 'api.update_record', 'api.delete_record', 'api.import_records',
+}
+
+@api.before_request
+def reject_writes_on_follower():
+    if replication_role == 'follower' and request.endpoint in WRITE_ENDPOINTS:
+        return jsonify({"error": "This instance is a read-only replication follower"}), 403
+
+@api.route('/replication/status', methods=['GET'])
+def replication_status():
+    if replication is None:
+        return jsonify({"role": "standalone"}), 200
+    try:
+        return jsonify(replication.status()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 @api.route('/databases', methods=['GET'])
 def get_databases():
@@ -65,7 +106,18 @@ def create_table(db_name):
             elif data['schema'][i] == "bool":
                 data['schema'][i] = bool
 
-        db_manager.create_table(db_name, data['name'], data['schema'], order, search_key)
+        # Optional range partitioning: {"boundaries": [...], "max_partition_size": n, "workers": n, "executor": "process"|"thread"}
+        partitioning = data.get('partitioning')
+        if partitioning is not None:
+            if not isinstance(partitioning, dict):
+                return jsonify({"error": "partitioning must be an object"}), 400
+            key_type = data['schema'].get(search_key)
+            if key_type is None:
+                return jsonify({"error": "A valid search_key is required for partitioned tables"}), 400
+            partitioning['boundaries'] = [key_type(b) for b in partitioning.get('boundaries', [])]
+
+        engine = data.get('engine', 'bplustree')
+        db_manager.create_table(db_name, data['name'], data['schema'], order, search_key, partitioning, engine)
         return jsonify({"message": f"Table '{data['name']}' created successfully in database '{db_name}'."}), 201
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -159,6 +211,80 @@ def delete_record(db_name, table_name, record_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+BULK_CHUNK_SIZE = 64 * 1024
+BULK_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def _bulk_format():
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt
+    return 'ndjson' if 'ndjson' in (request.content_type or '') else 'csv'
+
+def _request_chunks():
+    while True:
+        chunk = request.stream.read(BULK_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+@api.route('/databases/<db_name>/tables/<table_name>/import', methods=['POST'])
+def import_records(db_name, table_name):
+    try:
+        table = db_manager.get_table(db_name, table_name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    try:
+        batch_size = int(request.args.get('batch_size', 10000))
+        stats = bulk.import_records(table, _request_chunks(), _bulk_format(), batch_size)
+        return jsonify(stats), 201
+    except bulk.BulkImportError as e:
+        # Batches before the bad row are committed; tell the client how far it got
+        return jsonify({"error": str(e), "rows": e.rows}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/databases/<db_name>/tables/<table_name>/export', methods=['GET'])
+def export_records(db_name, table_name):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in bulk.FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'"}), 400
+    try:
+        table = db_manager.get_table(db_name, table_name)
+        return Response(stream_with_context(bulk.export_records(table, fmt)), mimetype=BULK_MIMETYPES[fmt])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/databases/<db_name>/join', methods=['POST'])
+def join_tables(db_name):
+    data = request.json
+    required = ('left', 'right', 'left_on', 'right_on')
+    if not data or any(field not in data for field in required):
+        return jsonify({"error": "left, right, left_on and right_on are required"}), 400
+
+    try:
+        left = db_manager.get_table(db_name, data['left'])
+        right = db_manager.get_table(db_name, data['right'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    try:
+        limit = data.get('limit')
+        strategy, rows = join(left, right, data['left_on'], data['right_on'],
+                              data.get('strategy', 'auto'), int(limit) if limit is not None else None)
+        # One {"left": ..., "right": ...} object per line, streamed as rows are produced
+        lines = (json.dumps({"left": l_rec, "right": r_rec}) + '\n' for l_rec, r_rec in rows)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson',
+                        headers={"X-Join-Strategy": strategy})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @api.route('/databases/<db_name>/tables/<table_name>/search', methods=['POST'])
 def search_records(db_name, table_name):
     data = request.json
@@ -193,10 +319,78 @@ def range_query(db_name, table_name):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@api.route('/databases/<db_name>/tables/<table_name>/aggregate', methods=['POST'])
+def aggregate_records(db_name, table_name):
+    data = request.json
+    if not data or 'func' not in data:
+        return jsonify({"error": "Aggregate function is required"}), 400
+
+    try:
+        table = db_manager.get_table(db_name, table_name)
+        start = data.get('start')
+        end = data.get('end')
+        result = table.aggregate(
+            data['func'],
+            data.get('field'),
+            int(start) if start is not None else None,
+            int(end) if end is not None else None,
+        )
+        return jsonify({"func": data['func'], "field": data.get('field'), "result": result}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/databases/<db_name>/tables/<table_name>/partitions', methods=['GET'])
+def get_partitions(db_name, table_name):
+    try:
+        table = db_manager.get_table(db_name, table_name)
+        if not isinstance(table, PartitionedTable):
+            return jsonify({"error": f"Table '{table_name}' is not partitioned"}), 400
+        partitions = table.partition_info()
+        return jsonify({"partitions": partitions, "count": len(partitions)}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/databases/<db_name>/tables/<table_name>/stats', methods=['GET'])
+def get_table_stats(db_name, table_name):
+    try:
+        table = db_manager.get_table(db_name, table_name)
+        return jsonify(table.stats()), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/databases/<db_name>/tables/<table_name>/compact', methods=['POST'])
+def compact_table(db_name, table_name):
+    data = request.get_json(silent=True) or {}
+    order = data.get('order')
+    background = data.get('background', True)
+
+    try:
+        table = db_manager.get_table(db_name, table_name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    try:
+        table.compact(int(order) if order is not None else None, background=bool(background))
+        if background:
+            return jsonify({"message": f"Compaction of table '{table_name}' started"}), 202
+        return jsonify({"message": f"Table '{table_name}' compacted", "stats": table.stats()}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @api.route('/databases/<db_name>/tables/<table_name>/visualize', methods=['GET'])
 def visualize_tree(db_name, table_name):
     try:
         table = db_manager.get_table(db_name, table_name)
+        if isinstance(table, PartitionedTable) or table.engine != 'bplustree':
+            return jsonify({"error": "Visualization is only supported for unpartitioned B+ tree tables"}), 400
         dot = table.data.visualize_tree()
         svg_data = dot.pipe(format='svg').decode('utf-8')
         return Response(svg_data, mimetype='image/svg+xml')
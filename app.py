@@ -1,3 +1,4 @@
+import os
 from flask import Flask, render_template
 from api.routes import api
 
@@ -9,4 +10,6 @@ def index():
     return render_template('index.html')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # The reloader imports api.routes in a second process, which would start a second
+    # replication leader or follower on the same store, so replication runs without it
+    app.run(debug=True, use_reloader=not os.environ.get('DB_REPLICATION_ROLE'))
\ No newline at end of file
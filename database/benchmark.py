@@ -0,0 +1,330 @@
+"""
+Command-line benchmarks for the database engine.
+
+Run from the repository root, e.g.
+    python -m database.benchmark partition --records 200000 --workers 1 2 4 8
+    python -m database.benchmark bulk --records 200000
+    python -m database.benchmark join --left 100000 --right 100000
+    python -m database.benchmark append --records 200000 --order 32
+    python -m database.benchmark lsm --records 200000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from database import bulk
+from database.bplustree import BPlusTree
+from database.db_manager import DatabaseManager
+from database.lsm import LSMTree
+from database.join import join
+from database.partition import PartitionedTable
+from database.table import Table
+
+
+def _print_rows(title, header, rows):
+    print(f"\n{title}")
+    widths = [max(len(str(x)) for x in column) for column in zip(header, *rows)]
+    for row in [header] + rows:
+        print("  ".join(str(x).rjust(w) for x, w in zip(row, widths)))
+
+
+def benchmark_partitioned_scan(num_records=200000, num_partitions=8, worker_counts=(1, 2, 4, 8),
+                               executor='process', repeats=3):
+    """
+    Measure full-scan and aggregate throughput of a PartitionedTable for each worker count.
+
+    Aggregates run one pool task per partition, so their rows/sec should grow with the
+    worker count up to the number of cores. Range scans always run in the calling
+    process and are reported as the single-core baseline.
+
+    Args:
+        num_records: Number of records loaded into the table
+        num_partitions: Number of equal-width range partitions
+        worker_counts: Pool sizes to compare
+        executor: 'thread' or 'process'
+        repeats: Runs per measurement; the best run is reported
+
+    Returns:
+        list: (workers, scan rows/sec, aggregate rows/sec) tuples
+    """
+    schema = {"id": int, "value": float}
+    step = max(1, num_records // num_partitions)
+    boundaries = list(range(step, num_records, step))[:num_partitions - 1]
+
+    results = []
+    with tempfile.TemporaryDirectory() as storage_dir:
+        table = PartitionedTable("bench", schema, order=32, search_key="id", storage_dir=storage_dir,
+                                 boundaries=boundaries, max_partition_size=num_records,
+                                 executor=executor)
+        # Load partitions directly to keep setup time out of the measurement
+        for i in range(num_records):
+            partition = table._partition_for(i)
+            partition.tree.insert(i, {"id": i, "value": float(i)})
+            partition.count += 1
+        for partition in table.partitions:
+            partition.mark_dirty()
+        table._flush()
+
+        for workers in worker_counts:
+            table.close()
+            table.workers = workers
+            # Warm up the pool; each worker caches the partition trees it has loaded
+            for _ in range(repeats):
+                table.aggregate('count')
+
+            scan_time = min(_timed(table.range_query, None, None) for _ in range(repeats))
+            agg_time = min(_timed(table.aggregate, 'sum', 'value') for _ in range(repeats))
+            results.append((workers, round(num_records / scan_time), round(num_records / agg_time)))
+        table.close()
+
+    _print_rows(
+        f"Partitioned scan ({num_records} records, {num_partitions} partitions, {executor} pool, "
+        f"{os.cpu_count()} cores)",
+        ("workers", "range scan rows/s", "aggregate rows/s"),
+        results,
+    )
+    return results
+
+
+def _generate_rows(num_records, fmt, rows_per_chunk=1000):
+    """
+    Lazily yield an encoded CSV or NDJSON body in chunks. Each chunk lists its
+    rows in descending key order, so import batches arrive unsorted.
+    """
+    if fmt == 'csv':
+        yield b"id,name,score,active\n"
+    for block_start in range(0, num_records, rows_per_chunk):
+        ids = range(block_start, min(block_start + rows_per_chunk, num_records))
+        if fmt == 'csv':
+            lines = [f"{i},user{i},{i * 0.5},{i % 2 == 0}\n" for i in reversed(ids)]
+        else:
+            lines = ['{"id": %d, "name": "user%d", "score": %s, "active": %s}\n'
+                     % (i, i, i * 0.5, 'true' if i % 2 == 0 else 'false') for i in reversed(ids)]
+        yield "".join(lines).encode()
+
+
+def benchmark_bulk_transfer(num_records=200000, formats=bulk.FORMATS, batch_size=10000):
+    """
+    Measure streaming import and export throughput for each format.
+
+    Args:
+        num_records: Number of rows to import and export
+        formats: Formats to compare
+        batch_size: Rows per sorted insert batch
+
+    Returns:
+        list: (format, import rows/sec, export rows/sec) tuples
+    """
+    schema = {"id": int, "name": str, "score": float, "active": bool}
+    results = []
+    for fmt in formats:
+        table = Table("bench", schema, order=32, search_key="id")
+        stats = bulk.import_records(table, _generate_rows(num_records, fmt), fmt, batch_size)
+
+        start_time = time.perf_counter()
+        exported_bytes = sum(len(chunk) for chunk in bulk.export_records(table, fmt))
+        export_time = time.perf_counter() - start_time
+
+        results.append((fmt, round(stats["rows_per_sec"]), round(num_records / export_time),
+                        f"{exported_bytes / (1024 * 1024):.1f}"))
+
+    _print_rows(
+        f"Bulk import/export ({num_records} rows, batches of {batch_size})",
+        ("format", "import rows/s", "export rows/s", "export MB"),
+        results,
+    )
+    return results
+
+
+def benchmark_join(num_left=100000, num_right=100000, order=32):
+    """
+    Measure each join strategy on two tables of num_left x num_right rows.
+
+    orders(id, customer_id, region) joins customers(id, region):
+        merge  orders.id = customers.id (both search keys)
+        index  orders.customer_id = customers.id (probe customers' tree)
+        hash   orders.region = customers.region (no index)
+
+    Returns:
+        list: (strategy, rows produced, seconds, rows/sec) tuples
+    """
+    orders = Table("orders", {"id": int, "customer_id": int, "region": int}, order=order, search_key="id")
+    customers = Table("customers", {"id": int, "region": int}, order=order, search_key="id")
+    # Each customer's region is unique, so the hash join is 1:1 like the other two
+    orders.insert_many({"id": i, "customer_id": (i * 7919) % num_right, "region": (i * 31) % num_left}
+                       for i in range(num_left))
+    customers.insert_many({"id": i, "region": i} for i in range(num_right))
+
+    results = []
+    for strategy, left_on, right_on in (("merge", "id", "id"), ("index", "customer_id", "id"),
+                                        ("hash", "region", "region")):
+        start_time = time.perf_counter()
+        used, rows = join(orders, customers, left_on, right_on, strategy)
+        produced = sum(1 for _ in rows)
+        elapsed = time.perf_counter() - start_time
+        results.append((used, produced, f"{elapsed:.3f}", round(produced / elapsed) if elapsed else 0))
+
+    _print_rows(
+        f"Join strategies ({num_left} x {num_right} rows)",
+        ("strategy", "rows", "seconds", "rows/s"),
+        results,
+    )
+    return results
+
+
+def benchmark_append_inserts(num_records=200000, order=32, seed=42):
+    """
+    Compare sequential and random insert throughput and leaf occupancy with the
+    append fast path enabled and disabled, both on the bare tree and through
+    Table.insert, whose duplicate check searches the tree before every insert.
+
+    Returns:
+        list: (workload, append_optimized, inserts/sec, Table.insert/sec, leaf occupancy) tuples
+    """
+    sequential = list(range(num_records))
+    shuffled = sequential[:]
+    random.Random(seed).shuffle(shuffled)
+
+    results = []
+    for workload, keys in (("sequential", sequential), ("random", shuffled)):
+        for append_optimized in (False, True):
+            tree = BPlusTree(order=order, append_optimized=append_optimized)
+            start_time = time.perf_counter()
+            for key in keys:
+                tree.insert(key, key)
+            elapsed = time.perf_counter() - start_time
+
+            table = Table("bench", {"id": int}, order=order, search_key="id")
+            table.data = BPlusTree(order=order, append_optimized=append_optimized)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start_time = time.perf_counter()
+                for key in keys:
+                    table.insert({"id": key})
+                table_elapsed = time.perf_counter() - start_time
+
+            results.append((workload, append_optimized, round(num_records / elapsed),
+                            round(num_records / table_elapsed), f"{tree.stats()['leaf_fill_factor']:.1%}"))
+
+    _print_rows(
+        f"Inserts ({num_records} keys, order {order})",
+        ("workload", "append_optimized", "inserts/s", "Table.insert/s", "leaf occupancy"),
+        results,
+    )
+    return results
+
+
+def benchmark_lsm_ingest(num_records=200000, num_lookups=20000, preload=50000, persisted_records=200,
+                         order=32, seed=42):
+    """
+    Compare the LSM engine against the B+ tree engine on an ingest-heavy workload.
+
+    Two measurements per engine:
+        raw        random-key inserts and point lookups on the engine itself
+        persisted  single Table.insert calls through a DatabaseManager into a table
+                   preloaded with `preload` rows. The manager saves the store after
+                   every write (the API's write path), so this includes persistence.
+
+    Returns:
+        list: (engine, inserts/sec, lookups/sec, persisted inserts/sec) tuples
+    """
+    keys = list(range(num_records))
+    rng = random.Random(seed)
+    rng.shuffle(keys)
+    lookups = [rng.randrange(num_records * 2) for _ in range(num_lookups)]
+    schema = {"id": int, "payload": str}
+
+    results = []
+    with tempfile.TemporaryDirectory() as storage_dir:
+        for engine in ("bplustree", "lsm"):
+            if engine == "lsm":
+                tree = LSMTree(os.path.join(storage_dir, "raw"))
+            else:
+                tree = BPlusTree(order=order)
+            start_time = time.perf_counter()
+            for key in keys:
+                tree.insert(key, {"id": key, "payload": "x" * 32})
+            insert_rate = num_records / (time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            for key in lookups:
+                tree.search(key)
+            lookup_rate = num_lookups / (time.perf_counter() - start_time)
+            if engine == "lsm":
+                tree.close()
+
+            manager = DatabaseManager(os.path.join(storage_dir, f"{engine}_store.pkl"))
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager.create_database("bench")
+                manager.create_table("bench", "events", schema, order, "id", engine=engine)
+                table = manager.get_table("bench", "events")
+                table.insert_many({"id": key, "payload": "x" * 32} for key in keys[:preload])
+                start_time = time.perf_counter()
+                for key in keys[preload:preload + persisted_records]:
+                    table.insert({"id": key, "payload": "x" * 32})
+                persisted_rate = persisted_records / (time.perf_counter() - start_time)
+                table.drop()
+
+            results.append((engine, round(insert_rate), round(lookup_rate), round(persisted_rate)))
+
+    _print_rows(
+        f"Ingest ({num_records} random inserts, {num_lookups} lookups, "
+        f"{persisted_records} persisted inserts after {preload} preloaded)",
+        ("engine", "inserts/s", "lookups/s", "persisted inserts/s"),
+        results,
+    )
+    return results
+
+
+def _timed(func, *args):
+    start_time = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database engine benchmarks")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    partition = sub.add_parser("partition", help="Partitioned scan scaling with worker count")
+    partition.add_argument("--records", type=int, default=200000)
+    partition.add_argument("--partitions", type=int, default=8)
+    partition.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    partition.add_argument("--executor", choices=PartitionedTable.EXECUTORS, default="process")
+
+    transfer = sub.add_parser("bulk", help="Streaming CSV/NDJSON import and export throughput")
+    transfer.add_argument("--records", type=int, default=200000)
+    transfer.add_argument("--batch-size", type=int, default=10000)
+
+    join_parser = sub.add_parser("join", help="Merge, index nested-loop and hash join throughput")
+    join_parser.add_argument("--left", type=int, default=100000)
+    join_parser.add_argument("--right", type=int, default=100000)
+
+    append = sub.add_parser("append", help="Sequential vs random insert throughput and leaf occupancy")
+    append.add_argument("--records", type=int, default=200000)
+    append.add_argument("--order", type=int, default=32)
+
+    lsm = sub.add_parser("lsm", help="LSM vs B+ tree ingest throughput")
+    lsm.add_argument("--records", type=int, default=200000)
+    lsm.add_argument("--lookups", type=int, default=20000)
+    lsm.add_argument("--preload", type=int, default=50000)
+    lsm.add_argument("--persisted", type=int, default=200)
+
+    args = parser.parse_args()
+    if args.benchmark == "partition":
+        benchmark_partitioned_scan(args.records, args.partitions, args.workers, args.executor)
+    elif args.benchmark == "bulk":
+        benchmark_bulk_transfer(args.records, batch_size=args.batch_size)
+    elif args.benchmark == "join":
+        benchmark_join(args.left, args.right)
+    elif args.benchmark == "append":
+        benchmark_append_inserts(args.records, args.order)
+    elif args.benchmark == "lsm":
+        benchmark_lsm_ingest(args.records, args.lookups, args.preload, args.persisted)
+
+
+if __name__ == "__main__":
+    main()
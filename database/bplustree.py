@@ -1,5 +1,6 @@
 
 import math 
+import sys
 from graphviz import Digraph
 import html 
 
@@ -25,11 +26,134 @@ class BPlusTreeNode:
         return not is_root and len(self.keys) < self.min_keys()
 
 class BPlusTree:
-    def __init__(self, order=8):
+    # Share of keys kept in the left node when splitting the rightmost node during appends
+    APPEND_SPLIT_RATIO = 0.9
+    # Consecutive inserts past the current maximum key before splits become right-biased
+    APPEND_STREAK_THRESHOLD = 8
+
+    def __init__(self, order=8, append_optimized=True):
         if order < 3:
             raise ValueError("Order must be at least 3")
         self.order = order
-        self.root = BPlusTreeNode(order=order, is_leaf=True) 
+        self.append_optimized = append_optimized
+        self.root = BPlusTreeNode(order=order, is_leaf=True)
+        self._rightmost_leaf = self.root
+        self._append_streak = 0
+
+    def __getstate__(self):
+        # Persist the tree as a flat, sorted item list. Pickling the node graph
+        # directly recurses down the leaf `next` chain and overflows the stack
+        # once a tree holds a few thousand leaves.
+        return {'order': self.order, 'append_optimized': self.append_optimized, 'items': self.get_all()}
+
+    def __setstate__(self, state):
+        self.append_optimized = state.get('append_optimized', True)
+        self._rightmost_leaf = None
+        self._append_streak = 0
+        if 'items' not in state:
+            # Older pickles stored the node graph itself
+            self.__dict__.update(state)
+            return
+        self.order = state['order']
+        self.root = BPlusTreeNode(order=self.order, is_leaf=True)
+        self._rightmost_leaf = self.root
+        for key, value in state['items']:
+            self.insert(key, value)
+
+    @classmethod
+    def bulk_load(cls, items, order=8, append_optimized=True):
+        """
+        Build a densely packed tree bottom-up from (key, value) pairs sorted by key.
+        Every node is filled to capacity except that the last two nodes of a level
+        share their entries evenly when the last one would otherwise underflow.
+        """
+        tree = cls(order=order, append_optimized=append_optimized)
+        items = list(items)
+        if not items:
+            return tree
+
+        def pack(entries, capacity, min_size):
+            groups = [entries[i:i + capacity] for i in range(0, len(entries), capacity)]
+            if len(groups) > 1 and len(groups[-1]) < min_size:
+                merged = groups[-2] + groups[-1]
+                half = len(merged) // 2
+                groups[-2:] = [merged[:half], merged[half:]]
+            return groups
+
+        # Each level is a list of (node, smallest key in its subtree)
+        level = []
+        for group in pack(items, order - 1, math.floor(order / 2)):
+            leaf = BPlusTreeNode(order=order, is_leaf=True)
+            leaf.keys = [key for key, _ in group]
+            leaf.values = [value for _, value in group]
+            if level:
+                level[-1][0].next = leaf
+            level.append((leaf, leaf.keys[0]))
+
+        while len(level) > 1:
+            parents = []
+            for group in pack(level, order, math.ceil(order / 2)):
+                node = BPlusTreeNode(order=order, is_leaf=False)
+                node.children = [child for child, _ in group]
+                node.keys = [min_key for _, min_key in group[1:]]
+                parents.append((node, group[0][1]))
+            level = parents
+
+        tree.root = level[0][0]
+        tree._rightmost_leaf = None
+        return tree
+
+    def stats(self):
+        """
+        Report the tree's shape: height, node counts per level, leaf fill factor
+        (keys / (order - 1)) with a 10%-bucket histogram, and estimated memory use.
+        """
+        capacity = self.order - 1
+        nodes_per_level = []
+        leaf_keys = []
+        internal_keys = 0
+        internal_nodes = 0
+        memory = sys.getsizeof(self)
+
+        level = [self.root]
+        while level:
+            nodes_per_level.append(len(level))
+            next_level = []
+            for node in level:
+                memory += (sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.keys)
+                           + sys.getsizeof(node.values) + sys.getsizeof(node.children))
+                memory += sum(sys.getsizeof(key) for key in node.keys)
+                if node.is_leaf:
+                    leaf_keys.append(len(node.keys))
+                    for value in node.values:
+                        memory += sys.getsizeof(value)
+                        if isinstance(value, dict):
+                            memory += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+                else:
+                    internal_nodes += 1
+                    internal_keys += len(node.keys)
+                    next_level.extend(node.children)
+            level = next_level
+
+        histogram = {f"{i * 10}-{i * 10 + 10}%": 0 for i in range(10)}
+        for count in leaf_keys:
+            bucket = min(9, int(count / capacity * 10))
+            histogram[f"{bucket * 10}-{bucket * 10 + 10}%"] += 1
+
+        num_keys = sum(leaf_keys)
+        return {
+            "order": self.order,
+            "height": len(nodes_per_level),
+            "num_keys": num_keys,
+            "nodes_per_level": nodes_per_level,
+            "leaf_count": len(leaf_keys),
+            "internal_count": internal_nodes,
+            "avg_keys_per_leaf": num_keys / len(leaf_keys),
+            "leaf_fill_factor": num_keys / (len(leaf_keys) * capacity),
+            "internal_fill_factor": internal_keys / (internal_nodes * capacity) if internal_nodes else None,
+            "leaf_fill_distribution": histogram,
+            "estimated_memory_bytes": memory,
+        }
 
     def _find_leaf(self, key):
         current = self.root
@@ -46,6 +170,12 @@ class BPlusTree:
         return current
 
     def search(self, key):
+        # Nothing is stored past the rightmost leaf's last key, so the duplicate check
+        # before an append is answered without descending from the root. Readers don't
+        # hold the table lock, so only read the cache; filling it is left to writers.
+        leaf = self._rightmost_leaf if self.append_optimized else None
+        if leaf is not None and leaf.keys and key > leaf.keys[-1]:
+            return None
         leaf_node = self._find_leaf(key)
         try:
             index = leaf_node.keys.index(key)
@@ -53,7 +183,28 @@ class BPlusTree:
         except ValueError:
             return None
 
+    def _get_rightmost_leaf(self):
+        if self._rightmost_leaf is None:
+            node = self.root
+            while not node.is_leaf:
+                node = node.children[-1]
+            self._rightmost_leaf = node
+        return self._rightmost_leaf
+
     def insert(self, key, value):
+        if self.append_optimized:
+            # Append fast path: a key past the current maximum belongs at the end of the
+            # rightmost leaf, so skip the descent from the root while that leaf has room
+            leaf = self._get_rightmost_leaf()
+            if leaf.keys and key > leaf.keys[-1]:
+                self._append_streak += 1
+                if not leaf.is_full():
+                    leaf.keys.append(key)
+                    leaf.values.append(value)
+                    return
+            else:
+                self._append_streak = 0
+
         # (Keep insert, _insert_non_full, _split_child as previously corrected)
         root = self.root
         if root.is_full():
@@ -89,6 +240,16 @@ class BPlusTree:
         # Use ceil(m/2)-1 key index for internal split promotion
         internal_promote_key_index = math.ceil(self.order / 2) - 1
 
+        if (self.append_optimized and self._append_streak >= self.APPEND_STREAK_THRESHOLD
+                and index == len(parent.children) - 1):
+            # Sequential appends only ever fill the rightmost node, so keep most keys on the
+            # left and leave a nearly empty right node instead of two half-empty ones.
+            # The right node still gets at least one key.
+            n = len(child_to_split.keys)
+            biased_index = math.ceil(n * self.APPEND_SPLIT_RATIO)
+            leaf_split_index = max(leaf_split_index, min(biased_index, n - 1))
+            internal_promote_key_index = max(internal_promote_key_index, min(biased_index, n - 2))
+
         new_node = BPlusTreeNode(order=self.order, is_leaf=child_to_split.is_leaf)
 
         if child_to_split.is_leaf:
@@ -100,6 +261,8 @@ class BPlusTree:
 
              new_node.next = child_to_split.next
              child_to_split.next = new_node
+             if child_to_split is self._rightmost_leaf:
+                 self._rightmost_leaf = new_node
              # Promote first key of new leaf
              parent.keys.insert(index, new_node.keys[0])
              parent.children.insert(index + 1, new_node)
@@ -125,6 +288,9 @@ class BPlusTree:
             return False # Key not found
 
         deleted = self._delete(self.root, key)
+        # Merges may have removed the cached rightmost leaf
+        self._rightmost_leaf = None
+        self._append_streak = 0
 
         if not deleted:
              print(f"Deletion failed: Key {key} not found.")
@@ -293,16 +459,25 @@ class BPlusTree:
         return result
 
     def get_all(self):
-        result = []
-        node = self.root
-        while not node.is_leaf:
-            if not node.children: return []
-            node = node.children[0]
+        return list(self.iter_items())
+
+    def iter_items(self, start_key=None):
+        """
+        Lazily yield (key, value) pairs in key order by walking the leaf chain,
+        starting from the first key >= start_key.
+        """
+        if start_key is None:
+            node = self.root
+            while not node.is_leaf:
+                if not node.children: return
+                node = node.children[0]
+        else:
+            node = self._find_leaf(start_key)
         while node:
             for k, v in zip(node.keys, node.values):
-                result.append((k, v))
+                if start_key is None or k >= start_key:
+                    yield k, v
             node = node.next
-        return result
 
 
     def _generate_record_html(self, record_data):
@@ -0,0 +1,141 @@
+"""
+Streaming bulk import and export of table records as CSV or NDJSON.
+
+Imports consume an iterable of byte chunks, so a request body can be parsed
+incrementally; exports are generators that walk the leaf chain. Neither side
+ever holds more than one batch of rows in memory.
+"""
+import codecs
+import csv
+import io
+import json
+import time
+
+FORMATS = ('csv', 'ndjson')
+
+
+class BulkImportError(ValueError):
+    """
+    An import stopped at a bad row. `rows` records had already been committed.
+    """
+
+    def __init__(self, message, rows):
+        super().__init__(message)
+        self.rows = rows
+
+
+def iter_lines(chunks, encoding='utf-8'):
+    """
+    Split a stream of byte chunks into text lines, keeping line endings.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        # The last piece is an incomplete line; wait for the next chunk
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def iter_csv_rows(chunks):
+    """
+    Yield one dict per CSV row, keyed by the header row.
+    """
+    yield from csv.DictReader(iter_lines(chunks))
+
+
+def iter_ndjson_rows(chunks):
+    """
+    Yield one dict per non-empty NDJSON line.
+    """
+    for line_number, line in enumerate(iter_lines(chunks), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object")
+        yield row
+
+
+def import_records(table, chunks, fmt='csv', batch_size=10000):
+    """
+    Parse `chunks` as CSV or NDJSON, coerce each row to the table's schema and
+    insert it in sorted batches of `batch_size` rows.
+
+    Each batch is committed as soon as it is inserted, and a batch is all-or-nothing.
+    The store is saved once, when the import finishes or fails, and other writers keep
+    saving as usual in the meantime.
+    If a row fails to parse or validate, or a batch contains an existing key, the import
+    stops with a BulkImportError. Earlier batches stay committed, and the error's `rows`
+    gives how many records they held. Pass a batch_size larger than the input to make
+    the whole import all-or-nothing.
+
+    Returns:
+        dict: rows imported, elapsed seconds and rows/sec
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of {FORMATS}.")
+    rows = iter_csv_rows(chunks) if fmt == 'csv' else iter_ndjson_rows(chunks)
+
+    start_time = time.perf_counter()
+    imported = 0
+    batch = []
+    try:
+        for row in rows:
+            batch.append(table.coerce_record(row))
+            if len(batch) >= batch_size:
+                imported += table.insert_many(batch, save=False)
+                batch = []
+        if batch:
+            imported += table.insert_many(batch, save=False)
+    except (ValueError, TypeError) as e:
+        raise BulkImportError(f"{e} ({imported} rows were imported before the failure)", imported) from e
+    finally:
+        if imported:
+            table.save()
+    elapsed = time.perf_counter() - start_time
+
+    rate = imported / elapsed if elapsed > 0 else 0.0
+    print(f"Imported {imported} rows into '{table.name}' in {elapsed:.3f}s ({rate:.0f} rows/sec).")
+    return {"rows": imported, "seconds": elapsed, "rows_per_sec": rate}
+
+
+def export_records(table, fmt='csv', rows_per_chunk=1000):
+    """
+    Yield the table's records as CSV or NDJSON text chunks of `rows_per_chunk` rows,
+    in key order.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of {FORMATS}.")
+    fields = list(table.schema.keys())
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields) if fmt == 'csv' else None
+    if writer:
+        writer.writeheader()
+
+    start_time = time.perf_counter()
+    exported = 0
+    for record in table.iter_records():
+        if writer:
+            writer.writerow(record)
+        else:
+            buffer.write(json.dumps(record) + '\n')
+        exported += 1
+        if exported % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+    elapsed = time.perf_counter() - start_time
+    rate = exported / elapsed if elapsed > 0 else 0.0
+    print(f"Exported {exported} rows from '{table.name}' in {elapsed:.3f}s ({rate:.0f} rows/sec).")
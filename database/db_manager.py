@@ -1,55 +1,170 @@
 import pickle
 import os
-from database.table import Table
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import partial
+from database.table import Table, synchronized
+from database.partition import PartitionedTable
 
 
 class DatabaseManager:
     def __init__(self, filepath="db_store.pkl"):
         self.filepath = filepath
+        # Partition files and other per-table storage live next to the main store
+        self.storage_dir = os.path.splitext(filepath)[0] + "_data"
         self.databases = {}
+        self.replication_log = None  # Set on a replication leader
+        self._batch_depth = 0
+        # Shared by every table: a write is applied and logged before the next one starts
+        self._lock = threading.RLock()
         self.load()  # Load existing DBs if file exists
 
     def save(self):
+        if self._batch_depth:
+            return  # Saved once when the outermost batch() exits
         with open(self.filepath, 'wb') as f:
             pickle.dump(self.databases, f)
 
+    @contextmanager
+    def batch(self):
+        """
+        Group many mutations into a single save of the store. Saves are deferred for
+        every table, so only use this where the calling thread is the sole writer, as on
+        a replication follower. A single bulk write should use insert_many(save=False).
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.save()
+
     def load(self):
         if os.path.exists(self.filepath):
             with open(self.filepath, 'rb') as f:
                 self.databases = pickle.load(f)
+            # Callbacks are not pickled; bind them to this manager
+            for db_name, tables in self.databases.items():
+                for table in tables.values():
+                    self._bind_table(db_name, table)
+
+    def _bind_table(self, db_name, table):
+        table.save_callback = self.save
+        table._lock = self._lock
+        table.mutation_callback = partial(self._log_table_mutation, db_name)
+
+    def enable_replication(self, replication_log):
+        """
+        Make this manager a replication leader that ships every mutation to `replication_log`.
+        """
+        with self._lock:
+            self.replication_log = replication_log
+            replication_log.attach(self)
+
+    def _log(self, op, **payload):
+        if self.replication_log is not None:
+            self.replication_log.append(op, payload)
 
+    def _log_table_mutation(self, db_name, table_name, op, payload):
+        self._log(op, db=db_name, table=table_name, **payload)
+
+    @synchronized
     def create_database(self, db_name):
         if db_name in self.databases:
             raise ValueError(f"Database '{db_name}' already exists.")
         self.databases[db_name] = {}
+        self._log('create_database', db=db_name)
         self.save()
         print(f"Database '{db_name}' created successfully.")
 
+    @synchronized
     def delete_database(self, db_name):
         if db_name not in self.databases:
             raise ValueError(f"Database '{db_name}' does not exist.")
+        for table in self.databases[db_name].values():
+            table.drop()
         del self.databases[db_name]
+        self._log('delete_database', db=db_name)
         self.save()
         print(f"Database '{db_name}' deleted successfully.")
 
     def list_databases(self):
         return list(self.databases.keys())
 
-    def create_table(self, db_name, table_name, schema, order=8, search_key=None):
+    def _table_storage_dir(self, db_name, table_name):
+        # Unique per table object, so a re-created or restored table never opens the
+        # files of one it replaces
+        return os.path.join(self.storage_dir, db_name, f"{table_name}_{uuid.uuid4().hex[:8]}")
+
+    def build_table(self, db_name, table_name, schema, order=8, search_key=None, partitioning=None,
+                    engine='bplustree'):
+        """
+        Construct a table with its own storage, without adding it to any database.
+        """
+        if partitioning is not None:
+            if engine != 'bplustree':
+                raise ValueError("Partitioned tables only support the 'bplustree' engine.")
+            return PartitionedTable(
+                table_name, schema, order, search_key,
+                storage_dir=self._table_storage_dir(db_name, table_name),
+                boundaries=partitioning.get('boundaries'),
+                max_partition_size=partitioning.get('max_partition_size', 10000),
+                workers=partitioning.get('workers'),
+                executor=partitioning.get('executor', 'process'),
+            )
+        return Table(table_name, schema, order, search_key, engine=engine,
+                     storage_dir=self._table_storage_dir(db_name, table_name))
+
+    def replace_databases(self, databases):
+        """
+        Swap in a complete set of databases built with build_table. Readers see either
+        the old state or the new one, never a mix; the old tables' storage is dropped after.
+        """
+        with self._lock:
+            old_databases = self.databases
+            for db_name, tables in databases.items():
+                for table in tables.values():
+                    self._bind_table(db_name, table)
+            self.databases = databases
+            self.save()
+        for tables in old_databases.values():
+            for table in tables.values():
+                table.drop()
+
+    @synchronized
+    def create_table(self, db_name, table_name, schema, order=8, search_key=None, partitioning=None,
+                     engine='bplustree'):
+        """
+        Create a table. `partitioning` is an optional range-partitioning spec:
+        {"boundaries": [...], "max_partition_size": int, "workers": int, "executor": "process"|"thread"}
+        `engine` selects the storage engine: 'bplustree' or the write-optimized 'lsm'.
+        """
         if db_name not in self.databases:
             raise ValueError(f"Database '{db_name}' does not exist.")
         if table_name in self.databases[db_name]:
             raise ValueError(f"Table '{table_name}' already exists in database '{db_name}'.")
-        self.databases[db_name][table_name] = Table(table_name, schema, order, search_key,save_callback=self.save)
+        table = self.build_table(db_name, table_name, schema, order, search_key, partitioning, engine)
+        self._bind_table(db_name, table)
+        self.databases[db_name][table_name] = table
+        self._log('create_table', db=db_name, table=table_name,
+                  schema={field: field_type.__name__ for field, field_type in schema.items()},
+                  order=order, search_key=search_key, partitioning=partitioning, engine=engine)
         self.save()
         print(f"Table '{table_name}' created successfully in database '{db_name}'.")
 
+    @synchronized
     def delete_table(self, db_name, table_name):
         if db_name not in self.databases:
             raise ValueError(f"Database '{db_name}' does not exist.")
         if table_name not in self.databases[db_name]:
             raise ValueError(f"Table '{table_name}' does not exist in database '{db_name}'.")
+        self.databases[db_name][table_name].drop()
         del self.databases[db_name][table_name]
+        self._log('delete_table', db=db_name, table=table_name)
         self.save()
         print(f"Table '{table_name}' deleted successfully from database '{db_name}'.")
 
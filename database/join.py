@@ -0,0 +1,122 @@
+"""
+Equi-joins between two tables of the same database.
+
+Three strategies, picked by which join columns are indexed (a table's
+search_key is the only indexed column):
+    merge  both sides join on their search_key; both leaf chains are walked in lockstep
+    index  one side joins on its search_key; the other side is scanned and each
+           value is probed in the indexed side's tree
+    hash   neither side is indexed; the right side is hashed and the left side streamed
+
+Every strategy is a generator of (left record, right record) pairs, so callers
+can stop early or pass `limit`.
+"""
+from itertools import islice
+
+STRATEGIES = ('auto', 'merge', 'index', 'hash')
+
+_NUMERIC_TYPES = (int, float)
+
+
+def _comparable(left_type, right_type):
+    return left_type is right_type or (left_type in _NUMERIC_TYPES and right_type in _NUMERIC_TYPES)
+
+
+def choose_strategy(left, right, left_on, right_on):
+    """
+    Pick the cheapest strategy the join columns allow.
+    """
+    if not _comparable(left.schema[left_on], right.schema[right_on]):
+        return 'hash'
+    left_indexed = left_on == left.search_key
+    right_indexed = right_on == right.search_key
+    if left_indexed and right_indexed:
+        return 'merge'
+    if left_indexed or right_indexed:
+        return 'index'
+    return 'hash'
+
+
+def merge_join(left, right):
+    """
+    Join two tables on their search keys by walking both key-ordered scans together.
+    Search keys are unique, so each key matches at most one record per side.
+    """
+    left_records = left.iter_records()
+    right_records = right.iter_records()
+    l_rec = next(left_records, None)
+    r_rec = next(right_records, None)
+    while l_rec is not None and r_rec is not None:
+        l_key = l_rec[left.search_key]
+        r_key = r_rec[right.search_key]
+        if l_key < r_key:
+            l_rec = next(left_records, None)
+        elif l_key > r_key:
+            r_rec = next(right_records, None)
+        else:
+            yield l_rec, r_rec
+            l_rec = next(left_records, None)
+            r_rec = next(right_records, None)
+
+
+def index_nested_loop_join(left, right, left_on, right_on):
+    """
+    Scan the unindexed side and probe the indexed side's tree for each value.
+    """
+    if right_on == right.search_key:
+        for l_rec in left.iter_records():
+            r_rec = right.get(l_rec[left_on])
+            if r_rec is not None:
+                yield l_rec, r_rec
+    elif left_on == left.search_key:
+        for r_rec in right.iter_records():
+            l_rec = left.get(r_rec[right_on])
+            if l_rec is not None:
+                yield l_rec, r_rec
+    else:
+        raise ValueError("Index join requires one side to join on its search_key.")
+
+
+def hash_join(left, right, left_on, right_on):
+    """
+    Build a hash table over the right side's join column and stream the left side through it.
+    """
+    buckets = {}
+    for r_rec in right.iter_records():
+        buckets.setdefault(r_rec[right_on], []).append(r_rec)
+    for l_rec in left.iter_records():
+        for r_rec in buckets.get(l_rec[left_on], ()):
+            yield l_rec, r_rec
+
+
+def join(left, right, left_on, right_on, strategy='auto', limit=None):
+    """
+    Join `left` and `right` on left[left_on] == right[right_on].
+
+    Returns:
+        tuple: (strategy used, generator of (left record, right record) pairs)
+    """
+    if left_on not in left.schema:
+        raise ValueError(f"Field '{left_on}' does not exist in table '{left.name}'.")
+    if right_on not in right.schema:
+        raise ValueError(f"Field '{right_on}' does not exist in table '{right.name}'.")
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unsupported join strategy '{strategy}'. Use one of {STRATEGIES}.")
+
+    best = choose_strategy(left, right, left_on, right_on)
+    if strategy == 'auto':
+        strategy = best
+    elif strategy == 'merge' and best != 'merge':
+        raise ValueError("Merge join requires both sides to join on their search_key.")
+    elif strategy == 'index' and best not in ('merge', 'index'):
+        raise ValueError("Index join requires one side to join on its search_key.")
+
+    if strategy == 'merge':
+        rows = merge_join(left, right)
+    elif strategy == 'index':
+        rows = index_nested_loop_join(left, right, left_on, right_on)
+    else:
+        rows = hash_join(left, right, left_on, right_on)
+    if limit is not None:
+        rows = islice(rows, limit)
+    return strategy, rows
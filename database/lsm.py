@@ -0,0 +1,497 @@
+"""
+A log-structured merge (LSM) tree: a write-optimized alternative to BPlusTree
+with the same interface Table uses (insert/search/update/delete/range_query/
+get_all/iter_items).
+
+Writes go to an in-memory sorted memtable. When it reaches `memtable_limit`
+entries it is flushed to an immutable sorted run file. Each run carries a
+Bloom filter and a sparse index (first key of every block), so a point lookup
+reads at most one block per run whose filter matches. Range queries k-way
+merge the memtable and all runs, newest value winning. A background thread
+performs size-tiered compaction: once `compaction_threshold` adjacent runs
+fall into the same size tier they are merged into one.
+
+On-disk layout, inside `directory`:
+    run_<id>.sst     [pickled blocks][pickled footer][8-byte footer offset]
+    MANIFEST.json    {"runs": [oldest ... newest], "next_run_id": n}
+
+The memtable itself is persisted with the owning Table's pickle.
+"""
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import os
+import pickle
+import shutil
+import struct
+import sys
+import threading
+
+TOMBSTONE = None  # Stored value for a deleted key; records are never None
+
+MANIFEST_FILE = "MANIFEST.json"
+_FOOTER_POINTER = struct.Struct("<Q")
+
+
+class BloomFilter:
+    """
+    Bit-array Bloom filter using double hashing over a stable (non-randomized) digest.
+    """
+
+    # Filters pickled before numeric keys were normalized lack the instance attribute
+    normalize_numbers = False
+
+    def __init__(self, expected_items, bits_per_key=10):
+        self.num_bits = max(8, expected_items * bits_per_key)
+        self.num_hashes = max(1, round(bits_per_key * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.normalize_numbers = True
+
+    def _positions(self, key):
+        # Keys that compare equal must hash alike: 1, 1.0 and True all hash as 1
+        if self.normalize_numbers and isinstance(key, (bool, float)) and float(key).is_integer():
+            key = int(key)
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class SortedRun:
+    """
+    An immutable, sorted run file with its Bloom filter and sparse block index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._lock = threading.Lock()
+        self._file.seek(-_FOOTER_POINTER.size, os.SEEK_END)
+        footer_offset, = _FOOTER_POINTER.unpack(self._file.read(_FOOTER_POINTER.size))
+        self._file.seek(footer_offset)
+        footer = pickle.load(self._file)
+        self.count = footer['count']
+        self.min_key = footer['min_key']
+        self.max_key = footer['max_key']
+        self.bloom = footer['bloom']
+        self.block_keys = footer['block_keys']  # First key of each block
+        self.block_spans = footer['block_spans']  # (offset, length) of each block
+
+    @classmethod
+    def write(cls, path, entries, expected_count, block_size=32, bits_per_key=10):
+        """
+        Write sorted (key, value) entries to a new run file and open it.
+        `entries` is consumed lazily; only the current block is held in memory.
+        `expected_count` (an upper bound on the number of entries) sizes the Bloom filter.
+        """
+        bloom = BloomFilter(expected_count, bits_per_key)
+        block_keys, block_spans = [], []
+        block, count, min_key, max_key = [], 0, None, None
+        offset = 0
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            def write_block():
+                nonlocal offset
+                data = pickle.dumps(block)
+                block_keys.append(block[0][0])
+                block_spans.append((offset, len(data)))
+                f.write(data)
+                offset += len(data)
+
+            for key, value in entries:
+                if min_key is None:
+                    min_key = key
+                max_key = key
+                count += 1
+                bloom.add(key)
+                block.append((key, value))
+                if len(block) >= block_size:
+                    write_block()
+                    block = []
+            if block:
+                write_block()
+
+            footer_offset = offset
+            pickle.dump({
+                'count': count, 'min_key': min_key, 'max_key': max_key, 'bloom': bloom,
+                'block_keys': block_keys, 'block_spans': block_spans,
+            }, f)
+            f.write(_FOOTER_POINTER.pack(footer_offset))
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def _read_block(self, index):
+        offset, length = self.block_spans[index]
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(length)
+        return pickle.loads(data)
+
+    def get(self, key):
+        """
+        Return (found, value); value is TOMBSTONE for a deleted key.
+        """
+        if not self.count or key < self.min_key or key > self.max_key:
+            return False, None
+        if not self.bloom.might_contain(key):
+            return False, None
+        index = bisect.bisect_right(self.block_keys, key) - 1
+        block = self._read_block(index)
+        i = bisect.bisect_left(block, (key,))
+        if i < len(block) and block[i][0] == key:
+            return True, block[i][1]
+        return False, None
+
+    def iter_entries(self, start_key=None):
+        if not self.count:
+            return
+        index = 0
+        if start_key is not None:
+            index = max(0, bisect.bisect_right(self.block_keys, start_key) - 1)
+        for block_index in range(index, len(self.block_spans)):
+            for key, value in self._read_block(block_index):
+                if start_key is None or key >= start_key:
+                    yield key, value
+
+    def close(self):
+        self._file.close()
+
+
+def _merge_sources(sources):
+    """
+    K-way merge of key-ordered (key, value) iterators given newest first.
+    Yields each key once with its newest value, tombstones included.
+    """
+    tagged = [((key, age, value) for key, value in source) for age, source in enumerate(sources)]
+    last_key = object()
+    for key, _, value in heapq.merge(*tagged, key=lambda entry: (entry[0], entry[1])):
+        if key == last_key:
+            continue
+        last_key = key
+        yield key, value
+
+
+class LSMTree:
+    def __init__(self, directory, memtable_limit=4096, block_size=32, bits_per_key=10,
+                 compaction_threshold=4, tier_fanout=4):
+        if memtable_limit < 1:
+            raise ValueError("memtable_limit must be at least 1")
+        if compaction_threshold < 2:
+            raise ValueError("compaction_threshold must be at least 2")
+        if os.path.isdir(directory) and os.listdir(directory):
+            # Only unpickling reopens a tree; a new one must not pick up leftover runs
+            raise ValueError(f"LSM directory '{directory}' is not empty.")
+        self.directory = directory
+        self.memtable_limit = memtable_limit
+        self.block_size = block_size
+        self.bits_per_key = bits_per_key
+        self.compaction_threshold = compaction_threshold
+        self.tier_fanout = tier_fanout
+        self._memtable = {}
+        self._memtable_keys = []  # Sorted keys of _memtable
+        self._open()
+
+    def _open(self):
+        self._lock = threading.Lock()
+        self._compaction_lock = threading.Lock()
+        self._compaction_needed = threading.Event()
+        self._compactor = None
+        self._closed = False
+        self._active_reads = 0  # Reads that may still touch runs replaced by compaction
+        self._retired_runs = []  # Replaced runs waiting for those reads to finish
+        self.runs = []
+        self.next_run_id = 0
+        os.makedirs(self.directory, exist_ok=True)
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            self.next_run_id = manifest['next_run_id']
+            self.runs = [SortedRun(os.path.join(self.directory, name)) for name in manifest['runs']]
+
+    def __getstate__(self):
+        with self._lock:
+            memtable = [(key, self._memtable[key]) for key in self._memtable_keys]
+        return {
+            'directory': self.directory, 'memtable_limit': self.memtable_limit,
+            'block_size': self.block_size, 'bits_per_key': self.bits_per_key,
+            'compaction_threshold': self.compaction_threshold, 'tier_fanout': self.tier_fanout,
+            'memtable': memtable,
+        }
+
+    def __setstate__(self, state):
+        memtable = state.pop('memtable')
+        self.__dict__.update(state)
+        self._memtable = dict(memtable)
+        self._memtable_keys = [key for key, _ in memtable]
+        self._open()
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(path + ".tmp", 'w') as f:
+            json.dump({'runs': [os.path.basename(run.path) for run in self.runs],
+                       'next_run_id': self.next_run_id}, f)
+        os.replace(path + ".tmp", path)
+
+    def _new_run_path(self):
+        path = os.path.join(self.directory, f"run_{self.next_run_id:08d}.sst")
+        self.next_run_id += 1
+        return path
+
+    # Writes
+
+    def _put(self, key, value):
+        with self._lock:
+            if key not in self._memtable:
+                bisect.insort(self._memtable_keys, key)
+            self._memtable[key] = value
+            full = len(self._memtable) >= self.memtable_limit
+        if full:
+            self.flush()
+
+    def insert(self, key, value):
+        self._put(key, value)
+
+    def update(self, key, new_value):
+        if self.search(key) is None:
+            return False
+        self._put(key, new_value)
+        return True
+
+    def delete(self, key):
+        if self.search(key) is None:
+            print(f"Deletion failed: Key {key} not found.")
+            return False
+        self._put(key, TOMBSTONE)
+        print(f"Deletion successful: Key {key} removed.")
+        return True
+
+    def flush(self):
+        """
+        Write the memtable out as a new sorted run.
+        """
+        with self._lock:
+            if not self._memtable:
+                return
+            entries = [(key, self._memtable[key]) for key in self._memtable_keys]
+            run = SortedRun.write(self._new_run_path(), entries, len(entries),
+                                  self.block_size, self.bits_per_key)
+            self.runs.append(run)
+            self._write_manifest()
+            self._memtable = {}
+            self._memtable_keys = []
+        self._schedule_compaction()
+
+    # Reads
+
+    def _pin_runs(self):
+        """
+        Return the current runs and keep any that compaction replaces open until
+        _unpin_runs(). Call with _lock held.
+        """
+        self._active_reads += 1
+        return self.runs[:]
+
+    def _unpin_runs(self):
+        with self._lock:
+            self._active_reads -= 1
+            if not self._active_reads:
+                self._remove_retired_runs()
+
+    def search(self, key):
+        with self._lock:
+            if key in self._memtable:
+                return self._memtable[key]
+            runs = self._pin_runs()
+        try:
+            for run in reversed(runs):
+                found, value = run.get(key)
+                if found:
+                    return value
+            return None
+        finally:
+            self._unpin_runs()
+
+    def iter_items(self, start_key=None):
+        """
+        Lazily yield live (key, value) pairs in key order, starting at start_key.
+        """
+        with self._lock:
+            memtable = [(key, self._memtable[key]) for key in self._memtable_keys
+                        if start_key is None or key >= start_key]
+            runs = self._pin_runs()
+        try:
+            sources = [iter(memtable)] + [run.iter_entries(start_key) for run in reversed(runs)]
+            for key, value in _merge_sources(sources):
+                if value is not TOMBSTONE:
+                    yield key, value
+        finally:
+            self._unpin_runs()
+
+    def range_query(self, start_key, end_key):
+        result = []
+        for key, value in self.iter_items(start_key):
+            if key > end_key:
+                break
+            result.append((key, value))
+        return result
+
+    def get_all(self):
+        return list(self.iter_items())
+
+    def stats(self):
+        """
+        Report memtable size, per-run entries/blocks/bytes/tier, and estimated memory use
+        (memtable plus the Bloom filters and sparse indexes held for every run).
+        Entry counts include shadowed values and tombstones not yet compacted away.
+        """
+        with self._lock:
+            runs = self.runs[:]
+            memtable_entries = len(self._memtable)
+        run_stats = []
+        memory = sys.getsizeof(self._memtable) + sys.getsizeof(self._memtable_keys)
+        memory += sum(sys.getsizeof(value) for value in list(self._memtable.values()))
+        for run in runs:
+            bloom_bytes = len(run.bloom.bits)
+            index_bytes = sys.getsizeof(run.block_keys) + sys.getsizeof(run.block_spans)
+            memory += bloom_bytes + index_bytes
+            run_stats.append({
+                "file": os.path.basename(run.path),
+                "entries": run.count,
+                "blocks": len(run.block_spans),
+                "bytes": os.path.getsize(run.path) if os.path.exists(run.path) else None,
+                "tier": self._tier(run),
+                "bloom_bytes": bloom_bytes,
+            })
+        return {
+            "memtable_entries": memtable_entries,
+            "memtable_limit": self.memtable_limit,
+            "run_count": len(runs),
+            "num_entries": memtable_entries + sum(run.count for run in runs),
+            "runs": run_stats,
+            "estimated_memory_bytes": memory,
+        }
+
+    # Compaction
+
+    def _tier(self, run):
+        return int(math.log(max(1, run.count / self.memtable_limit), self.tier_fanout))
+
+    def _pick_compaction(self):
+        """
+        Oldest group of at least compaction_threshold adjacent runs in the same size tier.
+        """
+        with self._lock:
+            runs = self.runs[:]
+        group = []
+        for run in runs:
+            if group and self._tier(run) != self._tier(group[0]):
+                if len(group) >= self.compaction_threshold:
+                    return group
+                group = []
+            group.append(run)
+        return group if len(group) >= self.compaction_threshold else None
+
+    def compact(self, runs=None):
+        """
+        Merge `runs` (adjacent, oldest first; default: all runs) into one run.
+        Tombstones are dropped when the merge includes the oldest run.
+        """
+        with self._compaction_lock:
+            self._compact(runs)
+
+    def _compact(self, runs):
+        with self._lock:
+            runs = list(runs if runs is not None else self.runs)
+            if len(runs) < 2 or any(run not in self.runs for run in runs):
+                return
+            drop_tombstones = runs[0] is self.runs[0]
+            path = self._new_run_path()
+
+        entries = _merge_sources([run.iter_entries() for run in reversed(runs)])
+        if drop_tombstones:
+            entries = ((key, value) for key, value in entries if value is not TOMBSTONE)
+        merged = SortedRun.write(path, entries, sum(run.count for run in runs),
+                                 self.block_size, self.bits_per_key)
+
+        with self._lock:
+            # Flushes only append, so the merged runs are still adjacent
+            start = self.runs.index(runs[0])
+            self.runs[start:start + len(runs)] = [merged]
+            self._write_manifest()
+            self._retired_runs.extend(runs)
+            if not self._active_reads:
+                self._remove_retired_runs()
+        print(f"Compacted {len(runs)} runs into {os.path.basename(path)} ({merged.count} entries).")
+
+    def _remove_retired_runs(self):
+        """
+        Close and delete replaced runs. Call with _lock held and no reads in flight;
+        an open file cannot be deleted on Windows.
+        """
+        for run in self._retired_runs:
+            run.close()
+            try:
+                os.remove(run.path)
+            except OSError as e:
+                print(f"Could not remove compacted run {run.path}: {e}")
+        self._retired_runs = []
+
+    def _schedule_compaction(self):
+        if self._pick_compaction() is None:
+            return
+        self._compaction_needed.set()
+        if self._compactor is None:
+            self._compactor = threading.Thread(target=self._compaction_loop, name="lsm-compaction", daemon=True)
+            self._compactor.start()
+
+    def _compaction_loop(self):
+        while True:
+            self._compaction_needed.wait()
+            self._compaction_needed.clear()
+            if self._closed:
+                return
+            group = self._pick_compaction()
+            while group is not None and not self._closed:
+                try:
+                    self.compact(group)
+                except Exception as e:
+                    print(f"Compaction failed: {e}")
+                    break
+                group = self._pick_compaction()
+
+    def close(self):
+        """
+        Stop background compaction and close run files.
+        """
+        self._closed = True
+        self._compaction_needed.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        with self._lock:
+            for run in self.runs:
+                run.close()
+            self._remove_retired_runs()
+
+    def drop(self):
+        """
+        Remove the tree's directory and everything in it.
+        """
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
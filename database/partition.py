@@ -0,0 +1,460 @@
+import bisect
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from database.bplustree import BPlusTree
+from database.table import Table, combine_aggregates, partial_aggregate, synchronized
+
+# Trees loaded by process-pool workers, keyed by partition file path.
+# Each entry is (version, tree) so a stale copy is reloaded after a write.
+_worker_trees = {}
+
+
+def _load_partition_tree(path, version):
+    cached = _worker_trees.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, 'rb') as f:
+        tree = pickle.load(f)
+    _worker_trees[path] = (version, tree)
+    return tree
+
+
+def _scan_tree(tree, start_key, end_key):
+    """
+    Yield (key, value) pairs with keys in [start_key, end_key]; None means unbounded.
+    Seeks to start_key and stops at the first key past end_key.
+    """
+    for key, value in tree.iter_items(start_key):
+        if end_key is not None and key > end_key:
+            return
+        yield key, value
+
+
+def _aggregate_tree(tree, start_key, end_key, field):
+    return partial_aggregate((v for _, v in _scan_tree(tree, start_key, end_key)), field)
+
+
+def _aggregate_partition_file(path, version, start_key, end_key, field):
+    """Process-pool task: partial aggregate over one persisted partition."""
+    return _aggregate_tree(_load_partition_tree(path, version), start_key, end_key, field)
+
+
+class RangePartition:
+    """
+    One contiguous key range [lower, next partition's lower) backed by its own B+ tree.
+    The tree is persisted to its own file and left out of the table's pickle.
+    """
+
+    def __init__(self, partition_id, lower, order, path):
+        self.partition_id = partition_id
+        self.lower = lower
+        self.order = order
+        self.path = path
+        self.count = 0
+        self.version = 0
+        self.tree = BPlusTree(order=order)
+        self.dirty = True
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['tree'] = None
+        state['dirty'] = False
+        return state
+
+    def load(self):
+        if self.tree is None:
+            if os.path.exists(self.path):
+                with open(self.path, 'rb') as f:
+                    self.tree = pickle.load(f)
+            else:
+                self.tree = BPlusTree(order=self.order)
+        return self.tree
+
+    def mark_dirty(self):
+        self.version += 1
+        self.dirty = True
+
+    def flush(self):
+        if not self.dirty or self.tree is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.tree, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class PartitionedTable(Table):
+    """
+    A table whose key space is split into range partitions, each with its own B+ tree.
+    Partitions split at their median key once they exceed `max_partition_size`.
+
+    Aggregates are fanned out over a worker pool, one task per partition, and each
+    task returns a small partial aggregate. The default 'process' pool sidesteps the
+    GIL; a 'thread' pool only helps when tasks block on I/O. Range scans run in this
+    process: the trees are already in memory here, and pickling every matching record
+    back from a worker costs more than the scan itself.
+    """
+
+    EXECUTORS = ('thread', 'process')
+
+    def __init__(self, name, schema, order=8, search_key=None, save_callback=None,
+                 mutation_callback=None, storage_dir='partitions', boundaries=None,
+                 max_partition_size=10000, workers=None, executor='process'):
+        super().__init__(name, schema, order, search_key, save_callback, mutation_callback)
+        self.data = None  # Records live in self.partitions
+
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Executor must be one of {self.EXECUTORS}, got '{executor}'.")
+        if max_partition_size < 2:
+            raise ValueError("max_partition_size must be at least 2.")
+
+        boundaries = list(boundaries or [])
+        if boundaries != sorted(set(boundaries)):
+            raise ValueError("Partition boundaries must be strictly increasing.")
+        key_type = schema[search_key]
+        for boundary in boundaries:
+            if not isinstance(boundary, key_type):
+                raise TypeError(f"Partition boundary {boundary!r} must be of type {key_type.__name__}")
+
+        self.storage_dir = storage_dir
+        self.max_partition_size = max_partition_size
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self._pool = None
+        self._next_partition_id = 0
+        self.partitions = [self._new_partition(lower) for lower in [None] + boundaries]
+
+    def __getstate__(self):
+        with self._lock:
+            self._flush()
+        state = super().__getstate__()
+        state['_pool'] = None
+        return state
+
+    def _new_partition(self, lower):
+        partition_id = self._next_partition_id
+        self._next_partition_id += 1
+        path = os.path.join(self.storage_dir, f"part_{partition_id}.pkl")
+        return RangePartition(partition_id, lower, self.order, path)
+
+    def _flush(self):
+        for partition in self.partitions:
+            partition.flush()
+
+    def _save(self):
+        self._flush()
+        super()._save()
+
+    def _get_pool(self):
+        """
+        A thread pool, or for the 'process' executor a list of single-process pools.
+        Each partition is always sent to the same process, so every partition tree is
+        loaded and cached by exactly one worker.
+        """
+        if self._pool is None:
+            if self.executor == 'process':
+                self._pool = [ProcessPoolExecutor(max_workers=1) for _ in range(self.workers)]
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        """
+        Shut down the worker pool, if one was started.
+        """
+        if self._pool is not None:
+            for pool in self._pool if isinstance(self._pool, list) else [self._pool]:
+                pool.shutdown()
+            self._pool = None
+
+    def drop(self):
+        """
+        Remove all partition files from disk.
+        """
+        self.close()
+        for partition in self.partitions:
+            partition.remove()
+        if os.path.isdir(self.storage_dir) and not os.listdir(self.storage_dir):
+            os.rmdir(self.storage_dir)
+
+    def _partition_index(self, key):
+        lowers = [p.lower for p in self.partitions[1:]]
+        return bisect.bisect_right(lowers, key)
+
+    def _partition_for(self, key):
+        return self.partitions[self._partition_index(key)]
+
+    def _overlapping(self, start_key, end_key):
+        """
+        Partitions whose key range intersects [start_key, end_key]; None means unbounded.
+        """
+        result = []
+        for i, partition in enumerate(self.partitions):
+            upper = self.partitions[i + 1].lower if i + 1 < len(self.partitions) else None
+            if start_key is not None and upper is not None and start_key >= upper:
+                continue
+            if end_key is not None and partition.lower is not None and partition.lower > end_key:
+                break
+            result.append(partition)
+        return result
+
+    def _split_partition(self, partition):
+        """
+        Split an oversized partition at its median key into two partitions.
+        """
+        items = partition.load().get_all()
+        mid = len(items) // 2
+        right = self._new_partition(items[mid][0])
+
+        left_tree = BPlusTree(order=self.order)
+        for key, value in items[:mid]:
+            left_tree.insert(key, value)
+        for key, value in items[mid:]:
+            right.tree.insert(key, value)
+
+        partition.tree = left_tree
+        partition.count = mid
+        partition.mark_dirty()
+        right.count = len(items) - mid
+
+        self.partitions.insert(self.partitions.index(partition) + 1, right)
+        print(f"Partition {partition.partition_id} of table '{self.name}' split at key '{right.lower}'.")
+
+    @synchronized
+    def insert(self, record):
+        """
+        Validate and insert the record into the partition that owns its key.
+        """
+        self.validate_record(record)
+        key = record[self.search_key]
+        partition = self._partition_for(key)
+        tree = partition.load()
+        if tree.search(key) is not None:
+            raise ValueError(f"Record with key '{key}' already exists.")
+        tree.insert(key, record)
+        partition.count += 1
+        partition.mark_dirty()
+        if partition.count > self.max_partition_size:
+            self._split_partition(partition)
+        self._log_mutation('insert', record=record)
+        self._save()
+        print(f"Record with key '{key}' inserted successfully.")
+
+    @synchronized
+    def insert_many(self, records, save=True):
+        """
+        Validate a batch of records and insert it in sorted key order, saving once.
+        The whole batch is rejected if any record is invalid or its key already exists.
+        With save=False the caller saves later, e.g. once after several batches.
+        """
+        keyed = []
+        for record in records:
+            self._check_record(record)
+            keyed.append((record[self.search_key], record))
+        keyed.sort(key=lambda item: item[0])
+        for i, (key, _) in enumerate(keyed):
+            if (i > 0 and keyed[i - 1][0] == key) or self.get(key) is not None:
+                raise ValueError(f"Record with key '{key}' already exists.")
+        for key, record in keyed:
+            partition = self._partition_for(key)
+            partition.load().insert(key, record)
+            partition.count += 1
+            partition.mark_dirty()
+        oversized = [p for p in self.partitions if p.count > self.max_partition_size]
+        while oversized:
+            for partition in oversized:
+                self._split_partition(partition)
+            oversized = [p for p in self.partitions if p.count > self.max_partition_size]
+        self._log_mutation('insert_many', records=[record for _, record in keyed])
+        if save:
+            self._save()
+        return len(keyed)
+
+    def get(self, record_id):
+        """
+        Return the record with the specified search_key value.
+        """
+        return self._partition_for(record_id).load().search(record_id)
+
+    def get_all(self):
+        """
+        Return all records in sorted key order.
+        """
+        return self.range_query(None, None)
+
+    def iter_records(self):
+        """
+        Lazily yield all records in sorted key order, one partition after another.
+        """
+        for partition in list(self.partitions):
+            for _, value in partition.load().iter_items():
+                yield value
+
+    @synchronized
+    def update(self, record_id, new_record):
+        """
+        Overwrite record at given ID if it exists, ensuring schema validity.
+        """
+        partition = self._partition_for(record_id)
+        tree = partition.load()
+        if tree.search(record_id) is None:
+            raise ValueError(f"No record found with key '{record_id}' to update.")
+        self.validate_record(new_record)
+        if not tree.update(record_id, new_record):
+            raise RuntimeError("Update failed unexpectedly.")
+        partition.mark_dirty()
+        self._log_mutation('update', key=record_id, record=new_record)
+        self._save()
+        print(f"Record with key '{record_id}' updated successfully.")
+
+    @synchronized
+    def delete(self, record_id):
+        """
+        Delete a record by its search_key value.
+        """
+        partition = self._partition_for(record_id)
+        tree = partition.load()
+        if tree.search(record_id) is None:
+            raise ValueError(f"No record found with key '{record_id}' to delete.")
+        tree.delete(record_id)
+        partition.count -= 1
+        partition.mark_dirty()
+        self._log_mutation('delete', key=record_id)
+        self._save()
+        print(f"Record with key '{record_id}' deleted successfully.")
+
+    def _fan_out(self, partitions, local_func, file_func, *args):
+        """
+        Run one task per partition and return the results in partition (key) order.
+        """
+        if len(partitions) <= 1 or self.workers <= 1:
+            return [local_func(p.load(), *args) for p in partitions]
+        pool = self._get_pool()
+        if self.executor == 'process':
+            # Writers flush from _save() under the lock; flushing here without it could race
+            # on the same .tmp file, or label a half-written tree with a newer version
+            with self._lock:
+                self._flush()
+                tasks = [(p.partition_id, p.path, p.version) for p in partitions]
+            futures = [pool[partition_id % len(pool)].submit(file_func, path, version, *args)
+                       for partition_id, path, version in tasks]
+        else:
+            futures = [pool.submit(local_func, p.load(), *args) for p in partitions]
+        return [future.result() for future in futures]
+
+    def range_query(self, start_value, end_value):
+        """
+        Return all records with keys in [start_value, end_value] in key order.
+        """
+        # Partitions cover disjoint, ordered key ranges, so concatenation is a key-order merge
+        return [
+            value
+            for partition in self._overlapping(start_value, end_value)
+            for _, value in _scan_tree(partition.load(), start_value, end_value)
+        ]
+
+    def aggregate(self, func, field=None, start_value=None, end_value=None):
+        """
+        Compute count/sum/min/max/avg of `field` by merging per-partition partial aggregates.
+        """
+        self._check_aggregate(func, field)
+        partitions = self._overlapping(start_value, end_value)
+        partials = self._fan_out(partitions, _aggregate_tree, _aggregate_partition_file,
+                                 start_value, end_value, field)
+        return combine_aggregates(partials, func)
+
+    def partitioning_spec(self):
+        """
+        The spec that recreates this table's current partition layout.
+        """
+        return {
+            "boundaries": [p.lower for p in self.partitions[1:]],
+            "max_partition_size": self.max_partition_size,
+            "workers": self.workers,
+            "executor": self.executor,
+        }
+
+    def partition_info(self):
+        """
+        Describe each partition's lower bound and record count.
+        """
+        return [
+            {"partition_id": p.partition_id, "lower": p.lower, "count": p.count}
+            for p in self.partitions
+        ]
+
+    def stats(self):
+        """
+        Per-partition tree statistics plus totals for the whole table.
+        """
+        partitions = []
+        for partition in self.partitions:
+            tree_stats = partition.load().stats()
+            tree_stats.update({"partition_id": partition.partition_id, "lower": partition.lower})
+            partitions.append(tree_stats)
+        leaf_slots = sum(p["leaf_count"] * (p["order"] - 1) for p in partitions)
+        num_keys = sum(p["num_keys"] for p in partitions)
+        return {
+            "table": self.name,
+            "engine": self.engine,
+            "compacting": self.is_compacting(),
+            "order": self.order,
+            "num_keys": num_keys,
+            "leaf_count": sum(p["leaf_count"] for p in partitions),
+            "internal_count": sum(p["internal_count"] for p in partitions),
+            "leaf_fill_factor": num_keys / leaf_slots if leaf_slots else 0.0,
+            "estimated_memory_bytes": sum(p["estimated_memory_bytes"] for p in partitions),
+            "partitions": partitions,
+        }
+
+    def _run_compaction(self, order):
+        """
+        Rebuild each partition's tree in turn. A partition that splits while its
+        rebuild is in progress is skipped; both halves were just written densely anyway.
+        """
+        new_order = order or self.order
+        rebuilt = 0
+        for partition in list(self.partitions):
+            with self._lock:
+                if partition not in self.partitions:
+                    continue
+                old_tree = partition.load()
+                items = old_tree.get_all()
+                self._compaction_deltas = []
+            try:
+                new_tree = BPlusTree.bulk_load(items, new_order)
+            except Exception:
+                with self._lock:
+                    self._compaction_deltas = None
+                raise
+            with self._lock:
+                deltas, self._compaction_deltas = self._compaction_deltas, None
+                if partition not in self.partitions or partition.tree is not old_tree:
+                    continue
+                for op, payload in deltas:
+                    if op == 'insert_many':
+                        records = [r for r in payload['records']
+                                   if self._partition_for(r[self.search_key]) is partition]
+                        payload = {'records': records}
+                    else:
+                        key = payload['record'][self.search_key] if op == 'insert' else payload['key']
+                        if self._partition_for(key) is not partition:
+                            continue
+                    self._replay(new_tree, op, payload)
+                partition.tree = new_tree
+                partition.order = new_order
+                partition.mark_dirty()
+                rebuilt += 1
+        with self._lock:
+            self.order = new_order
+            self._save()
+        print(f"Table '{self.name}' compacted: {rebuilt} of {len(self.partitions)} partitions rebuilt, "
+              f"order {new_order}.")
@@ -0,0 +1,357 @@
+"""
+Leader/follower replication by log shipping through a shared directory.
+
+The leader appends every mutation (DDL and record writes) as one JSON line to
+numbered log segments and periodically writes a full snapshot. Followers tail
+the segments and apply entries to their own DatabaseManager; a follower that
+falls more than `max_lag` entries behind, or whose next entry has already been
+rotated away, reloads the latest snapshot and resumes from there.
+
+Directory layout:
+    log_<first seq>.ndjson   log segments, one JSON entry per line
+    snapshot.json            {"seq": n, "ts": t, "databases": {...}}
+"""
+import glob
+import json
+import os
+import threading
+import time
+
+from database.partition import PartitionedTable
+
+SCHEMA_TYPES = {"str": str, "int": int, "float": float, "bool": bool}
+
+SNAPSHOT_FILE = "snapshot.json"
+
+
+def _segment_path(directory, first_seq):
+    return os.path.join(directory, f"log_{first_seq:012d}.ndjson")
+
+
+def _list_segments(directory):
+    """
+    Return (first seq, path) for every log segment, oldest first.
+    """
+    segments = []
+    for path in glob.glob(os.path.join(directory, "log_*.ndjson")):
+        first_seq = int(os.path.basename(path)[len("log_"):-len(".ndjson")])
+        segments.append((first_seq, path))
+    return sorted(segments)
+
+
+def _read_entries(path, offset=0):
+    """
+    Yield (entry, end offset) for each complete line after `offset`.
+    A trailing line without a newline is still being written and is skipped.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            yield json.loads(line), offset
+
+
+def build_snapshot(databases):
+    """
+    Serialize every table's definition and records into a JSON-compatible dict.
+    """
+    snapshot = {}
+    for db_name, tables in databases.items():
+        snapshot[db_name] = {}
+        for table_name, table in tables.items():
+            snapshot[db_name][table_name] = {
+                "schema": {field: field_type.__name__ for field, field_type in table.schema.items()},
+                "order": table.order,
+                "search_key": table.search_key,
+                "partitioning": table.partitioning_spec() if isinstance(table, PartitionedTable) else None,
+                "engine": table.engine,
+                "records": table.get_all(),
+            }
+    return snapshot
+
+
+def restore_snapshot(manager, snapshot):
+    """
+    Replace all of `manager`'s databases with the contents of a snapshot.
+    The tables are built and filled off to the side, then swapped in at once, so
+    readers on a follower never see missing or half-filled tables.
+    """
+    databases = {}
+    try:
+        for db_name, tables in snapshot.items():
+            databases[db_name] = {}
+            for table_name, spec in tables.items():
+                schema = {field: SCHEMA_TYPES[name] for field, name in spec["schema"].items()}
+                table = manager.build_table(db_name, table_name, schema, spec["order"], spec["search_key"],
+                                            spec["partitioning"], spec.get("engine", "bplustree"))
+                databases[db_name][table_name] = table
+                table.insert_many(spec["records"])
+    except Exception:
+        for tables in databases.values():
+            for table in tables.values():
+                table.drop()
+        raise
+    manager.replace_databases(databases)
+
+
+def apply_entry(manager, entry):
+    """
+    Apply one log entry to `manager`.
+    """
+    op = entry["op"]
+    if op == "create_database":
+        manager.create_database(entry["db"])
+    elif op == "delete_database":
+        manager.delete_database(entry["db"])
+    elif op == "create_table":
+        schema = {field: SCHEMA_TYPES[name] for field, name in entry["schema"].items()}
+        manager.create_table(entry["db"], entry["table"], schema, entry["order"],
+                             entry["search_key"], entry["partitioning"], entry.get("engine", "bplustree"))
+    elif op == "delete_table":
+        manager.delete_table(entry["db"], entry["table"])
+    elif op == "insert":
+        manager.get_table(entry["db"], entry["table"]).insert(entry["record"])
+    elif op == "insert_many":
+        manager.get_table(entry["db"], entry["table"]).insert_many(entry["records"])
+    elif op == "update":
+        manager.get_table(entry["db"], entry["table"]).update(entry["key"], entry["record"])
+    elif op == "delete":
+        manager.get_table(entry["db"], entry["table"]).delete(entry["key"])
+    else:
+        raise ValueError(f"Unknown replication op '{op}'.")
+
+
+class ReplicationLog:
+    """
+    Leader side: appends mutations to the shared directory and writes snapshots.
+
+    A snapshot is written every `snapshot_every` entries, after which a new
+    segment is started and all but the newest `retain_segments` are deleted.
+    """
+
+    def __init__(self, directory, snapshot_every=10000, retain_segments=2):
+        if retain_segments < 1:
+            raise ValueError("retain_segments must be at least 1.")
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.retain_segments = retain_segments
+        self.manager = None
+        self.seq = 0
+        self.snapshot_seq = 0
+        self._segment = None
+        # Entries must reach the segment in seq order even when several tables write at once
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        segments = _list_segments(directory)
+        if segments:
+            first_seq, path = segments[-1]
+            self.seq = first_seq - 1
+            for entry, _ in _read_entries(path):
+                self.seq = entry["seq"]
+
+    def attach(self, manager):
+        """
+        Bind the leader's manager and snapshot its current state as the replication baseline.
+        """
+        self.manager = manager
+        self.write_snapshot()
+
+    def append(self, op, payload):
+        """
+        Append one entry. The caller must already have applied the mutation and must
+        hold the manager's write lock, so a snapshot taken here matches the log exactly.
+        """
+        with self._lock:
+            self.seq += 1
+            entry = {"seq": self.seq, "ts": time.time(), "op": op}
+            entry.update(payload)
+            if self._segment is None:
+                self._segment = open(_segment_path(self.directory, self.seq), 'a')
+            self._segment.write(json.dumps(entry) + "\n")
+            self._segment.flush()
+            if self.seq - self.snapshot_seq >= self.snapshot_every:
+                self._write_snapshot()
+
+    def write_snapshot(self):
+        """
+        Write a full snapshot at the current sequence number and rotate the log.
+        Call with the manager's write lock held.
+        """
+        with self._lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        snapshot = {"seq": self.seq, "ts": time.time(), "databases": build_snapshot(self.manager.databases)}
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(path + ".tmp", path)
+        self.snapshot_seq = self.seq
+
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        for _, old_path in _list_segments(self.directory)[:-self.retain_segments]:
+            os.remove(old_path)
+        print(f"Replication snapshot written at seq {self.seq}.")
+
+    def status(self):
+        return {"role": "leader", "seq": self.seq, "snapshot_seq": self.snapshot_seq}
+
+    def close(self):
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+
+
+class Follower:
+    """
+    Follower side: tails the leader's log and applies it to a local manager.
+    """
+
+    def __init__(self, manager, directory, max_lag=10000, poll_interval=0.5):
+        self.manager = manager
+        self.directory = directory
+        self.max_lag = max_lag
+        self.poll_interval = poll_interval
+        self.applied_seq = 0
+        self.applied_ts = None
+        self.resyncs = 0  # Snapshot restores forced by a failed apply or a gap in the log
+        self.last_error = None
+        self._segment_first_seq = None
+        self._offset = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def catch_up_from_snapshot(self, only_if_newer=False):
+        """
+        Reset local state to the leader's latest snapshot. Returns False if there is none,
+        or if `only_if_newer` is set and the snapshot is not past applied_seq.
+        """
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return False
+        with open(path) as f:
+            snapshot = json.load(f)
+        if only_if_newer and snapshot["seq"] <= self.applied_seq:
+            return False
+        restore_snapshot(self.manager, snapshot["databases"])
+        self.applied_seq = snapshot["seq"]
+        self.applied_ts = snapshot["ts"]
+        self._segment_first_seq = None
+        self._offset = 0
+        print(f"Follower restored snapshot at seq {self.applied_seq}.")
+        return True
+
+    def _pending_segments(self):
+        """
+        Segments that may hold entries after applied_seq, or None if some were already rotated away.
+        """
+        segments = _list_segments(self.directory)
+        needed = self.applied_seq + 1
+        start = None
+        for i, (first_seq, _) in enumerate(segments):
+            if first_seq <= needed:
+                start = i
+        if start is None:
+            return None if segments else []
+        return segments[start:]
+
+    def _iter_entries(self, segments):
+        for first_seq, path in segments:
+            offset = self._offset if first_seq == self._segment_first_seq else 0
+            for entry, end_offset in _read_entries(path, offset):
+                yield first_seq, entry, end_offset
+
+    def lag(self):
+        """
+        Return (entries behind the leader, seconds since the oldest unapplied entry was written).
+        Both are None when the entries this follower needs have been rotated away.
+        """
+        segments = self._pending_segments()
+        if segments is None:
+            return None, None
+        behind, oldest_ts = 0, None
+        for _, entry, _ in self._iter_entries(segments):
+            if entry["seq"] > self.applied_seq:
+                behind += 1
+                if oldest_ts is None:
+                    oldest_ts = entry["ts"]
+        return behind, (time.time() - oldest_ts if oldest_ts is not None else 0.0)
+
+    def poll(self):
+        """
+        Apply every complete entry the leader has written since the last poll.
+        Returns the number of entries applied.
+
+        If an entry fails to apply or the log has a gap, this follower has diverged
+        from the leader; it restores the latest snapshot instead of retrying the same
+        entry forever. The failure is kept in `last_error` and counted in `resyncs`.
+        """
+        behind, _ = self.lag()
+        if behind is None or behind > self.max_lag:
+            # A snapshot older than applied_seq would only move this follower backwards;
+            # replaying the pending entries is the faster way forward
+            self.catch_up_from_snapshot(only_if_newer=True)
+
+        try:
+            return self._apply_pending()
+        except Exception as e:
+            self.resyncs += 1
+            self.last_error = {"seq": self.applied_seq + 1, "error": str(e), "ts": time.time()}
+            print(f"Replication apply failed at seq {self.applied_seq + 1}: {e}. Restoring snapshot.")
+            self.catch_up_from_snapshot()
+            return 0
+
+    def _apply_pending(self):
+        applied = 0
+        with self.manager.batch():
+            for first_seq, entry, end_offset in self._iter_entries(self._pending_segments() or []):
+                if entry["seq"] > self.applied_seq:
+                    if entry["seq"] != self.applied_seq + 1:
+                        raise RuntimeError(f"Replication gap: expected seq {self.applied_seq + 1}, got {entry['seq']}.")
+                    apply_entry(self.manager, entry)
+                    self.applied_seq = entry["seq"]
+                    self.applied_ts = entry["ts"]
+                    applied += 1
+                self._segment_first_seq = first_seq
+                self._offset = end_offset
+        return applied
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Replication poll failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """
+        Bootstrap from the latest snapshot and keep applying the log in a background thread.
+        """
+        self.catch_up_from_snapshot()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replication-follower", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        behind, lag_seconds = self.lag()
+        return {
+            "role": "follower",
+            "applied_seq": self.applied_seq,
+            "lag_entries": behind,
+            "lag_seconds": lag_seconds,
+            "resyncs": self.resyncs,
+            "last_error": self.last_error,
+        }
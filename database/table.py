@@ -1,26 +1,145 @@
+import functools
+import threading
+from itertools import takewhile
+
 from database.bplustree import BPlusTree
+from database.lsm import LSMTree
+
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+
+
+def partial_aggregate(records, field=None):
+    """
+    Reduce records to a (count, sum, min, max) tuple over `field`.
+    Partials from disjoint key ranges can be merged with `combine_aggregates`.
+    """
+    count, total, low, high = 0, 0, None, None
+    for record in records:
+        count += 1
+        if field is None:
+            continue
+        value = record[field]
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            total += value
+        if low is None or value < low:
+            low = value
+        if high is None or value > high:
+            high = value
+    return count, total, low, high
+
+
+def combine_aggregates(partials, func):
+    """
+    Merge partial aggregates and return the final value of `func`.
+    """
+    if func not in AGGREGATE_FUNCTIONS:
+        raise ValueError(f"Unsupported aggregate '{func}'. Use one of {AGGREGATE_FUNCTIONS}.")
+    count, total, low, high = 0, 0, None, None
+    for p_count, p_total, p_low, p_high in partials:
+        count += p_count
+        total += p_total
+        if p_low is not None and (low is None or p_low < low):
+            low = p_low
+        if p_high is not None and (high is None or p_high > high):
+            high = p_high
+    if func == 'count':
+        return count
+    if func == 'sum':
+        return total
+    if func == 'min':
+        return low
+    if func == 'max':
+        return high
+    return total / count if count else None
+
+
+def synchronized(method):
+    """
+    Run a mutation under `self._lock`, so it cannot interleave with the swap at the
+    end of an online compaction. Readers never take the lock. A DatabaseManager
+    shares one lock among all its tables, making each mutation and its replication
+    log entry atomic with respect to every other write.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class Table:
-    def __init__(self, name, schema, order=8, search_key=None, save_callback=None):
+    # Storage engines selectable at creation time; both expose the same tree interface
+    ENGINES = ('bplustree', 'lsm')
+
+    def __init__(self, name, schema, order=8, search_key=None, save_callback=None, mutation_callback=None,
+                 engine='bplustree', storage_dir=None):
         self.name = name
         self.schema = schema
         self.order = order
         self.search_key = search_key
         self.save_callback = save_callback
+        self.mutation_callback = mutation_callback
 
         if self.search_key is None or self.search_key not in schema:
             raise ValueError("A valid `search_key` must be provided and exist in the schema.")
+        if engine not in self.ENGINES:
+            raise ValueError(f"Engine must be one of {self.ENGINES}, got '{engine}'.")
+
+        self.engine = engine
+        if engine == 'lsm':
+            if storage_dir is None:
+                raise ValueError("The 'lsm' engine needs a storage directory for its run files.")
+            self.data = LSMTree(storage_dir)
+        else:
+            self.data = BPlusTree(order=order)
+        self._init_runtime_state()
+
+    def _init_runtime_state(self):
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._compaction_thread = None
+        self._compaction_deltas = None  # Mutations made while a rebuild is in progress
+
+    def __getstate__(self):
+        # Callbacks are bound to the owning DatabaseManager, which re-binds them on load
+        state = self.__dict__.copy()
+        state['save_callback'] = None
+        state['mutation_callback'] = None
+        for runtime_key in ('_lock', '_compacting', '_compaction_thread', '_compaction_deltas'):
+            state.pop(runtime_key, None)
+        return state
 
-        self.data = BPlusTree(order=order)
+    def __setstate__(self, state):
+        state.setdefault('mutation_callback', None)
+        state.setdefault('engine', 'bplustree')
+        self.__dict__.update(state)
+        self._init_runtime_state()
 
     def _save(self):
         if self.save_callback:
             self.save_callback()
 
+    @synchronized
+    def save(self):
+        """
+        Persist the store now, after writes made with insert_many(save=False).
+        """
+        self._save()
+
+    def _log_mutation(self, op, **payload):
+        if self._compaction_deltas is not None:
+            self._compaction_deltas.append((op, payload))
+        if self.mutation_callback:
+            self.mutation_callback(self.name, op, payload)
+
     def validate_record(self, record):
         """
         Ensure the record contains exactly the schema's keys with correct data types.
         """
+        self._check_record(record)
+        print(f"Record validated successfully: {record}")
+
+    def _check_record(self, record):
         if set(record.keys()) != set(self.schema.keys()):
             raise ValueError(f"Record keys do not match schema keys: {self.schema.keys()}")
 
@@ -28,8 +147,8 @@ class Table:
             expected_type = self.schema[key]
             if not isinstance(value, expected_type):
                 raise TypeError(f"Field '{key}' must be of type {expected_type.__name__}, got {type(value).__name__}")
-        print(f"Record validated successfully: {record}")
 
+    @synchronized
     def insert(self, record):
         """
         Validate and insert the record using the search_key as index key.
@@ -39,9 +158,56 @@ class Table:
         if self.data.search(key) is not None:
             raise ValueError(f"Record with key '{key}' already exists.")
         self.data.insert(key, record)
+        self._log_mutation('insert', record=record)
         self._save()
         print(f"Record with key '{key}' inserted successfully.")
 
+    def coerce_record(self, record):
+        """
+        Convert raw field values (CSV strings, JSON ints for float fields) to the schema's types.
+        Values that cannot be converted are left for validation to reject.
+        """
+        coerced = {}
+        for key, value in record.items():
+            expected_type = self.schema.get(key)
+            if expected_type is None or type(value) is expected_type:
+                coerced[key] = value
+            elif expected_type is bool and isinstance(value, str):
+                lowered = value.strip().lower()
+                if lowered not in ('true', 'false', '1', '0'):
+                    raise ValueError(f"Field '{key}' must be a boolean, got '{value}'")
+                coerced[key] = lowered in ('true', '1')
+            elif expected_type is not bool and (isinstance(value, str) or (expected_type is float and type(value) is int)):
+                try:
+                    coerced[key] = expected_type(value)
+                except ValueError:
+                    raise ValueError(f"Field '{key}' must be of type {expected_type.__name__}, got '{value}'")
+            else:
+                coerced[key] = value
+        return coerced
+
+    @synchronized
+    def insert_many(self, records, save=True):
+        """
+        Validate a batch of records and insert it in sorted key order, saving once.
+        The whole batch is rejected if any record is invalid or its key already exists.
+        With save=False the caller saves later, e.g. once after several batches.
+        """
+        keyed = []
+        for record in records:
+            self._check_record(record)
+            keyed.append((record[self.search_key], record))
+        keyed.sort(key=lambda item: item[0])
+        for i, (key, _) in enumerate(keyed):
+            if (i > 0 and keyed[i - 1][0] == key) or self.data.search(key) is not None:
+                raise ValueError(f"Record with key '{key}' already exists.")
+        for key, record in keyed:
+            self.data.insert(key, record)
+        self._log_mutation('insert_many', records=[record for _, record in keyed])
+        if save:
+            self._save()
+        return len(keyed)
+
     def get(self, record_id):
         """
         Return the record with the specified search_key value.
@@ -59,6 +225,14 @@ class Table:
 
         return all_records
 
+    def iter_records(self):
+        """
+        Lazily yield all records in sorted key order.
+        """
+        for _, value in self.data.iter_items():
+            yield value
+
+    @synchronized
     def update(self, record_id, new_record):
         """
         Overwrite record at given ID if it exists, ensuring schema validity.
@@ -68,9 +242,11 @@ class Table:
         self.validate_record(new_record)
         if not self.data.update(record_id, new_record):
             raise RuntimeError("Update failed unexpectedly.")
+        self._log_mutation('update', key=record_id, record=new_record)
         self._save()
         print(f"Record with key '{record_id}' updated successfully.")
 
+    @synchronized
     def delete(self, record_id):
         """
         Delete a record by its search_key value.
@@ -78,6 +254,7 @@ class Table:
         if self.data.search(record_id) is None:
             raise ValueError(f"No record found with key '{record_id}' to delete.")
         self.data.delete(record_id)
+        self._log_mutation('delete', key=record_id)
         self._save()
         print(f"Record with key '{record_id}' deleted successfully.")
 
@@ -85,9 +262,112 @@ class Table:
         """
         Return all records with keys in [start_value, end_value].
         """
-        return [
-            value for key, value in self.data.get_all()
-            if start_value <= key <= end_value
-        ]
+        return [value for _, value in self.data.range_query(start_value, end_value)]
+
+    def aggregate(self, func, field=None, start_value=None, end_value=None):
+        """
+        Compute count/sum/min/max/avg of `field`, optionally restricted to keys in [start_value, end_value].
+        """
+        self._check_aggregate(func, field)
+        items = takewhile(lambda item: end_value is None or item[0] <= end_value,
+                          self.data.iter_items(start_value))
+        return combine_aggregates([partial_aggregate((record for _, record in items), field)], func)
+
+    def _check_aggregate(self, func, field):
+        if func != 'count' and field not in self.schema:
+            raise ValueError(f"Aggregate '{func}' requires a field from the schema.")
+        if func in ('sum', 'avg') and self.schema[field] not in (int, float):
+            raise ValueError(f"Aggregate '{func}' requires a numeric field; '{field}' is "
+                             f"{self.schema[field].__name__}.")
+
+    def drop(self):
+        """
+        Release any files the storage engine keeps outside the main store.
+        """
+        if self.engine == 'lsm':
+            self.data.drop()
+
+    def stats(self):
+        """
+        Report the storage engine's health statistics for this table.
+        """
+        stats = {"table": self.name, "engine": self.engine, "compacting": self.is_compacting()}
+        stats.update(self.data.stats())
+        return stats
+
+    def is_compacting(self):
+        return self._compacting
+
+    def compact(self, order=None, background=True):
+        """
+        Rebuild the table's storage densely, optionally with a new B+ tree `order`.
+
+        The new tree is bulk-loaded from a snapshot while reads and writes keep using
+        the old one. Writes made meanwhile are replayed onto the new tree, which is then
+        swapped in under the table lock. The lock is only held for the snapshot and the
+        swap, in both modes, since a DatabaseManager shares it among all its tables.
+        With background=True this runs in a thread and the thread is returned.
+        """
+        if order is not None and order < 3:
+            raise ValueError("Order must be at least 3")
+        if order is not None and self.engine != 'bplustree':
+            raise ValueError("Only B+ tree tables have an order to change.")
+        with self._lock:
+            if self._compacting:
+                raise ValueError(f"Table '{self.name}' is already being compacted.")
+            self._compacting = True
+        if not background:
+            self._compaction_task(order)
+            return None
+        self._compaction_thread = threading.Thread(
+            target=self._compaction_task, args=(order,), name=f"compact-{self.name}", daemon=True)
+        self._compaction_thread.start()
+        return self._compaction_thread
 
+    def _compaction_task(self, order):
+        try:
+            self._run_compaction(order)
+        finally:
+            self._compacting = False
 
+    def _run_compaction(self, order):
+        if self.engine == 'lsm':
+            self.data.compact()
+            return
+        new_order = order or self.order
+        with self._lock:
+            items = self.data.get_all()
+            self._compaction_deltas = []
+        try:
+            new_tree = BPlusTree.bulk_load(items, new_order)
+        except Exception:
+            with self._lock:
+                self._compaction_deltas = None
+            raise
+        with self._lock:
+            for op, payload in self._compaction_deltas:
+                self._replay(new_tree, op, payload)
+            self._compaction_deltas = None
+            self.data = new_tree
+            self.order = new_order
+            self._save()
+        print(f"Table '{self.name}' compacted: {len(items)} records, order {new_order}.")
+
+    def _replay(self, tree, op, payload):
+        """
+        Re-apply a logged mutation to `tree`. Replays are upserts and delete-if-present,
+        so applying one the tree already reflects is harmless.
+        """
+        if op == 'insert':
+            entries = [(payload['record'][self.search_key], payload['record'])]
+        elif op == 'insert_many':
+            entries = [(record[self.search_key], record) for record in payload['records']]
+        elif op == 'update':
+            entries = [(payload['key'], payload['record'])]
+        else:
+            if tree.search(payload['key']) is not None:
+                tree.delete(payload['key'])
+            return
+        for key, record in entries:
+            if not tree.update(key, record):
+                tree.insert(key, record)
@@ -0,0 +1,126 @@
+import contextlib
+import io
+import pickle
+import random
+
+import pytest
+
+from database.bplustree import BPlusTree
+
+ORDERS = (4, 5, 8, 32)
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    # delete() prints its outcome
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def check_tree(tree, expected):
+    """
+    Compare the tree with `expected` and verify its structural invariants.
+    """
+    assert tree.get_all() == sorted(expected.items())
+
+    leaves, depths = [], set()
+
+    def walk(node, low, high, depth):
+        assert node.keys == sorted(node.keys)
+        assert len(node.keys) <= tree.order - 1
+        # Every key lies within the separators its parent placed around it
+        for key in node.keys:
+            assert (low is None or key >= low) and (high is None or key < high), (key, low, high)
+        if node.is_leaf:
+            assert len(node.keys) == len(node.values)
+            leaves.append(node)
+            depths.add(depth)
+            return
+        assert len(node.children) == len(node.keys) + 1
+        bounds = [low] + node.keys + [high]
+        for i, child in enumerate(node.children):
+            walk(child, bounds[i], bounds[i + 1], depth + 1)
+
+    walk(tree.root, None, None, 0)
+    assert len(depths) == 1
+
+    chained, node = [], leaves[0]
+    while node is not None:
+        chained.append(node)
+        node = node.next
+    assert chained == leaves
+    if tree._rightmost_leaf is not None:
+        assert tree._rightmost_leaf is leaves[-1]
+
+    for key, value in expected.items():
+        assert tree.search(key) == value
+    top = max(expected, default=0)
+    for key in (-1, top + 1, top + 1000):
+        assert tree.search(key) is None
+
+
+def run_workload(tree, rng, rounds=12):
+    expected, next_key = {}, 0
+    for _ in range(rounds):
+        # An append run well past APPEND_STREAK_THRESHOLD triggers right-biased splits
+        for _ in range(rng.randrange(BPlusTree.APPEND_STREAK_THRESHOLD * 2, 200)):
+            next_key += rng.randrange(1, 4)
+            tree.insert(next_key, f"v{next_key}")
+            expected[next_key] = f"v{next_key}"
+        for _ in range(rng.randrange(20, 80)):
+            key = rng.randrange(next_key)
+            if key not in expected:
+                tree.insert(key, f"r{key}")
+                expected[key] = f"r{key}"
+        for key in rng.sample(sorted(expected), min(len(expected), rng.randrange(10, 60))):
+            assert tree.update(key, f"u{key}")
+            expected[key] = f"u{key}"
+        for key in rng.sample(sorted(expected), min(len(expected), rng.randrange(10, 60))):
+            assert tree.delete(key)
+            del expected[key]
+        assert not tree.delete(-5)
+        check_tree(tree, expected)
+    return expected
+
+
+@pytest.mark.parametrize("order", ORDERS)
+@pytest.mark.parametrize("append_optimized", (True, False))
+def test_mixed_workload_matches_dict(order, append_optimized):
+    tree = BPlusTree(order=order, append_optimized=append_optimized)
+    run_workload(tree, random.Random(order))
+
+
+@pytest.mark.parametrize("order", ORDERS)
+def test_appends_after_pickle_reload(order):
+    tree = BPlusTree(order=order)
+    expected = run_workload(tree, random.Random(100 + order), rounds=3)
+    tree = pickle.loads(pickle.dumps(tree))
+    check_tree(tree, expected)
+    start = max(expected) + 1
+    for key in range(start, start + 300):
+        tree.insert(key, key)
+        expected[key] = key
+    check_tree(tree, expected)
+
+
+@pytest.mark.parametrize("order", ORDERS)
+def test_sequential_appends_pack_leaves(order):
+    packed, halved = BPlusTree(order=order), BPlusTree(order=order, append_optimized=False)
+    for key in range(5000):
+        packed.insert(key, key)
+        halved.insert(key, key)
+    check_tree(packed, {key: key for key in range(5000)})
+    assert packed.stats()["leaf_count"] <= halved.stats()["leaf_count"]
+    if order >= 8:
+        assert packed.stats()["leaf_fill_factor"] > 0.85
+
+
+def test_search_does_not_fill_the_rightmost_leaf_cache():
+    tree = BPlusTree(order=4)
+    for key in range(100):
+        tree.insert(key, key)
+    tree.delete(50)
+    assert tree._rightmost_leaf is None
+    assert tree.search(1000) is None
+    assert tree.search(99) == 99
+    assert tree._rightmost_leaf is None
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import threading
+
+import pytest
+
+from database import bulk
+from database.db_manager import DatabaseManager
+
+SCHEMA = {"id": int, "name": str}
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "store.pkl"))
+    manager.create_database("db")
+    manager.create_table("db", "imports", SCHEMA, search_key="id")
+    manager.create_table("db", "other", SCHEMA, search_key="id")
+    return manager
+
+
+def reloaded(manager, table_name):
+    return DatabaseManager(manager.filepath).get_table("db", table_name).get_all()
+
+
+def test_other_writes_are_saved_while_an_import_streams(manager):
+    seen_on_disk = []
+
+    def chunks():
+        yield b'{"id": 1, "name": "a"}\n'
+        manager.get_table("db", "other").insert({"id": 7, "name": "concurrent"})
+        seen_on_disk.append(reloaded(manager, "other"))
+        yield b'{"id": 2, "name": "b"}\n'
+
+    stats = bulk.import_records(manager.get_table("db", "imports"), chunks(), 'ndjson', batch_size=1)
+
+    assert stats["rows"] == 2
+    assert seen_on_disk == [[{"id": 7, "name": "concurrent"}]]
+    assert [r["id"] for r in reloaded(manager, "imports")] == [1, 2]
+
+
+def test_failed_import_saves_and_reports_committed_rows(manager):
+    table = manager.get_table("db", "imports")
+    table.insert({"id": 1, "name": "existing"})
+
+    with pytest.raises(bulk.BulkImportError) as error:
+        bulk.import_records(table, [b'id,name\n10,x\n1,dup\n'], 'csv', batch_size=1)
+
+    assert error.value.rows == 1
+    assert [r["id"] for r in reloaded(manager, "imports")] == [1, 10]
+
+
+def test_import_parses_rows_split_across_chunks(manager):
+    body = b"id,name\n" + b"".join(b"%d,name%d\n" % (i, i) for i in range(100))
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+    bulk.import_records(manager.get_table("db", "imports"), chunks, 'csv', batch_size=30)
+    assert reloaded(manager, "imports") == [{"id": i, "name": f"name{i}"} for i in range(100)]
+
+
+def test_concurrent_batches_leave_saving_enabled(manager):
+    def nest():
+        for _ in range(200):
+            with manager.batch():
+                pass
+
+    threads = [threading.Thread(target=nest) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert manager._batch_depth == 0
+    manager.get_table("db", "other").insert({"id": 1, "name": "saved"})
+    assert reloaded(manager, "other") == [{"id": 1, "name": "saved"}]
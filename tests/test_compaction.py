@@ -0,0 +1,137 @@
+import contextlib
+import io
+import random
+import threading
+
+import pytest
+
+from database.bplustree import BPlusTree
+from database.db_manager import DatabaseManager
+from database.partition import PartitionedTable
+from database.table import Table
+
+SCHEMA = {"id": int, "v": int}
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@pytest.fixture
+def slow_bulk_load(monkeypatch):
+    """
+    Hold every rebuild until the test releases it, so writes land mid-compaction.
+    """
+    release = threading.Event()
+    bulk_load = BPlusTree.bulk_load.__func__
+
+    def wait_then_load(cls, items, order=8, append_optimized=True):
+        release.wait(timeout=10)
+        return bulk_load(cls, items, order, append_optimized)
+
+    monkeypatch.setattr(BPlusTree, "bulk_load", classmethod(wait_then_load))
+    return release
+
+
+def write_randomly(table, expected, rng, count):
+    for _ in range(count):
+        key = rng.randrange(5000)
+        if key in expected and rng.random() < 0.5:
+            if rng.random() < 0.5:
+                table.delete(key)
+                del expected[key]
+            else:
+                table.update(key, {"id": key, "v": -key})
+                expected[key] = -key
+        elif key not in expected:
+            table.insert({"id": key, "v": key})
+            expected[key] = key
+    batch = [{"id": 10000 + i, "v": i} for i in range(rng.randrange(1, 20))]
+    table.insert_many(batch)
+    expected.update({record["id"]: record["v"] for record in batch})
+    for record in batch:
+        del expected[record["id"]]
+        table.delete(record["id"])
+
+
+def records(expected):
+    return [{"id": key, "v": value} for key, value in sorted(expected.items())]
+
+
+def load(table, rng, count=2000):
+    expected = {}
+    for key in rng.sample(range(5000), count):
+        table.insert({"id": key, "v": key})
+        expected[key] = key
+    return expected
+
+
+def test_compaction_keeps_writes_made_while_rebuilding(slow_bulk_load):
+    rng = random.Random(1)
+    table = Table("t", SCHEMA, order=4, search_key="id")
+    expected = load(table, rng)
+
+    thread = table.compact(order=16)
+    with pytest.raises(ValueError):
+        table.compact()
+    write_randomly(table, expected, rng, 1500)
+    slow_bulk_load.set()
+    thread.join()
+
+    assert not table.is_compacting()
+    assert table.order == table.data.order == 16
+    assert table.get_all() == records(expected)
+    assert table.stats()["num_keys"] == len(expected)
+
+
+def test_compaction_with_concurrent_writer_thread(tmp_path, monkeypatch):
+    rng = random.Random(2)
+    manager = DatabaseManager(str(tmp_path / "store.pkl"))
+    manager.create_database("db")
+    manager.create_table("db", "t", SCHEMA, order=4, search_key="id")
+    table = manager.get_table("db", "t")
+    expected = load(table, rng, 1000)
+
+    replayed = []
+    replay = Table._replay
+    monkeypatch.setattr(Table, "_replay", lambda *args: replayed.append(args) or replay(*args))
+
+    writer = threading.Thread(target=write_randomly, args=(table, expected, rng, 1000))
+    writer.start()
+    while writer.is_alive():
+        for order in (8, 5, 32):
+            table.compact(order=order, background=False)
+    writer.join()
+
+    # A foreground compaction releases the lock while it rebuilds, so writes overlap it
+    assert replayed
+
+    assert table.get_all() == records(expected)
+    assert DatabaseManager(str(tmp_path / "store.pkl")).get_table("db", "t").get_all() == records(expected)
+
+
+def test_dense_rebuild_raises_fill_factor():
+    table = Table("t", SCHEMA, order=8, search_key="id")
+    load(table, random.Random(3))
+    before = table.stats()["leaf_fill_factor"]
+    table.compact(background=False)
+    assert table.stats()["leaf_fill_factor"] > max(before, 0.9)
+
+
+def test_partitioned_compaction_with_splits_during_rebuild(tmp_path, slow_bulk_load):
+    rng = random.Random(4)
+    table = PartitionedTable("p", SCHEMA, order=4, search_key="id", storage_dir=str(tmp_path / "p"),
+                             boundaries=[2500], max_partition_size=300)
+    expected = load(table, rng, 500)
+
+    thread = table.compact(order=10)
+    write_randomly(table, expected, rng, 600)
+    slow_bulk_load.set()
+    thread.join()
+
+    assert [record["id"] for record in table.iter_records()] == sorted(expected)
+    assert table.get_all() == records(expected)
+    assert table.stats()["num_keys"] == len(expected)
+    table.drop()
@@ -0,0 +1,175 @@
+import contextlib
+import io
+import os
+import pickle
+import random
+import threading
+
+import pytest
+
+from database.lsm import MANIFEST_FILE, BloomFilter, LSMTree
+from database.table import Table
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@pytest.fixture
+def manual_tree(tmp_path):
+    # Never compacts in the background, so tests control exactly which runs get replaced
+    lsm = LSMTree(str(tmp_path / "manual"), memtable_limit=16, compaction_threshold=1000)
+    for key in range(100):
+        lsm.insert(key, key)
+    lsm.flush()
+    yield lsm
+    lsm.close()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    # A tiny memtable and low compaction threshold exercise flushes and merges constantly
+    lsm = LSMTree(str(tmp_path / "lsm"), memtable_limit=16, block_size=4, compaction_threshold=2, tier_fanout=2)
+    yield lsm
+    lsm.close()
+
+
+def check_matches(lsm, expected):
+    assert lsm.get_all() == sorted(expected.items())
+    for key in range(-5, 505):
+        assert lsm.search(key) == expected.get(key)
+    for start, end in ((0, 499), (37, 181), (250, 250), (-10, 3), (400, 1000), (10, 5)):
+        assert lsm.range_query(start, end) == sorted((k, v) for k, v in expected.items() if start <= k <= end)
+    assert [k for k, _ in lsm.iter_items(123)] == sorted(k for k in expected if k >= 123)
+
+
+def reload(lsm):
+    state = pickle.dumps(lsm)
+    lsm.close()
+    return pickle.loads(state)
+
+
+def test_operations_match_dict_across_flush_compaction_and_reload(tree):
+    rng = random.Random(7)
+    expected = {}
+    lsm = tree
+    for step in range(3000):
+        key = rng.randrange(500)
+        action = rng.random()
+        if action < 0.5:
+            if key not in expected:
+                lsm.insert(key, {"id": key, "step": step})
+                expected[key] = {"id": key, "step": step}
+        elif action < 0.75:
+            assert lsm.update(key, {"id": key, "step": -step}) == (key in expected)
+            if key in expected:
+                expected[key] = {"id": key, "step": -step}
+        else:
+            assert lsm.delete(key) == (key in expected)
+            expected.pop(key, None)
+
+        if step % 500 == 499:
+            check_matches(lsm, expected)
+            lsm.flush()
+            lsm.compact()
+            assert len(lsm.runs) <= 1
+            check_matches(lsm, expected)
+            lsm = reload(lsm)
+            check_matches(lsm, expected)
+    lsm.close()
+
+
+def test_reload_keeps_unflushed_memtable(tree):
+    for key in range(10):
+        tree.insert(key, key)
+    assert not tree.runs
+    reopened = reload(tree)
+    assert reopened.get_all() == [(key, key) for key in range(10)]
+    reopened.close()
+
+
+def test_numeric_keys_that_compare_equal_are_found_in_runs(tree):
+    for key in range(100):
+        tree.insert(key, key)
+    tree.flush()
+    assert not tree._memtable
+    for key in range(100):
+        assert tree.search(float(key)) == key
+
+
+def test_bloom_filter_normalizes_numeric_keys():
+    bloom = BloomFilter(10)
+    bloom.add(3)
+    assert bloom.might_contain(3.0)
+    bloom.add(2.0)
+    assert bloom.might_contain(2)
+
+
+def test_concurrent_readers_and_writer(tree):
+    errors = []
+    done = threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                tree.search(random.randrange(2000))
+                for _ in tree.iter_items(random.randrange(2000)):
+                    break
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    for key in range(2000):
+        tree.insert(key, key)
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert not errors
+    assert tree.get_all() == [(key, key) for key in range(2000)]
+
+
+def test_table_range_query_uses_engine(tmp_path):
+    table = Table("t", {"id": int, "v": int}, search_key="id", engine="lsm", storage_dir=str(tmp_path / "t"))
+    table.insert_many({"id": i, "v": i} for i in range(100))
+    table.data.flush()
+    calls = []
+    original = table.data.range_query
+    table.data.range_query = lambda start, end: calls.append((start, end)) or original(start, end)
+    assert [r["id"] for r in table.range_query(10, 20)] == list(range(10, 21))
+    assert calls == [(10, 20)]
+    table.drop()
+
+
+def test_new_tree_rejects_non_empty_directory(tree):
+    for key in range(100):
+        tree.insert(key, key)
+    tree.flush()
+    with pytest.raises(ValueError):
+        LSMTree(tree.directory)
+
+
+def test_compaction_closes_and_removes_replaced_runs(manual_tree):
+    tree = manual_tree
+    replaced = list(tree.runs)
+    assert len(replaced) > 1
+    tree.compact()
+    assert len(tree.runs) == 1
+    assert all(run._file.closed and not os.path.exists(run.path) for run in replaced)
+    assert sorted(os.listdir(tree.directory)) == sorted([MANIFEST_FILE, os.path.basename(tree.runs[0].path)])
+
+
+def test_iteration_survives_compaction(manual_tree):
+    tree = manual_tree
+    items = tree.iter_items()
+    assert next(items) == (0, 0)
+    replaced = list(tree.runs)
+    tree.compact()
+    # Replaced runs stay open until the iterator finishes
+    assert all(os.path.exists(run.path) for run in replaced)
+    assert list(items) == [(key, key) for key in range(1, 100)]
+    assert not any(os.path.exists(run.path) for run in replaced)
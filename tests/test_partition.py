@@ -0,0 +1,111 @@
+import contextlib
+import io
+import random
+import threading
+
+import pytest
+
+from database.db_manager import DatabaseManager
+from database.partition import PartitionedTable
+from database.table import Table
+
+SCHEMA = {"id": int, "value": float}
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "store.pkl"))
+    manager.create_database("db")
+    yield manager
+    for table in manager.databases["db"].values():
+        if isinstance(table, PartitionedTable):
+            table.close()  # Shut down worker processes
+
+
+def create_partitioned(manager, name="p", executor="process", workers=2, max_partition_size=200):
+    manager.create_table("db", name, SCHEMA, order=5, search_key="id",
+                         partitioning={"boundaries": [250, 500, 750], "max_partition_size": max_partition_size,
+                                       "workers": workers, "executor": executor})
+    return manager.get_table("db", name)
+
+
+def check_matches_plain_table(table, plain):
+    assert table.get_all() == plain.get_all()
+    for start, end in ((None, None), (0, 999), (100, 600), (250, 250), (-10, 3), (740, None), (10, 5)):
+        if start is not None and end is not None:
+            assert table.range_query(start, end) == plain.range_query(start, end)
+        assert table.aggregate('count', None, start, end) == plain.aggregate('count', None, start, end)
+        for func in ('sum', 'min', 'max', 'avg'):
+            assert table.aggregate(func, 'value', start, end) == pytest.approx(plain.aggregate(func, 'value', start, end))
+
+
+@pytest.mark.parametrize("executor", PartitionedTable.EXECUTORS)
+def test_splits_and_queries_match_plain_table(manager, executor):
+    table = create_partitioned(manager, executor=executor)
+    plain = Table("plain", SCHEMA, order=5, search_key="id")
+    rng = random.Random(3)
+    records = [{"id": i, "value": rng.uniform(-100, 100)} for i in rng.sample(range(1000), 800)]
+    table.insert_many(records[:400])
+    for record in records[400:]:
+        table.insert(record)
+    plain.insert_many(records)
+    for i in range(0, 1000, 7):
+        if table.get(i) is not None:
+            table.delete(i)
+            plain.delete(i)
+
+    assert len(table.partitions) > 4
+    assert all(p["count"] <= table.max_partition_size for p in table.partition_info())
+    assert sum(p["count"] for p in table.partition_info()) == len(plain.get_all())
+    check_matches_plain_table(table, plain)
+
+    reloaded = DatabaseManager(manager.filepath).get_table("db", "p")
+    try:
+        assert reloaded.partition_info() == table.partition_info()
+        check_matches_plain_table(reloaded, plain)
+    finally:
+        reloaded.close()
+
+
+def test_process_aggregates_while_writers_save(manager):
+    table = create_partitioned(manager)
+    table.insert_many({"id": i, "value": float(i)} for i in range(0, 1000, 2))
+    errors = []
+
+    def write():
+        try:
+            for i in range(1, 400, 2):
+                table.insert({"id": i, "value": float(i)})
+        except Exception as e:
+            errors.append(e)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        table.aggregate('count')
+    writer.join()
+
+    assert not errors
+    assert table.aggregate('count') == 700
+    assert table.aggregate('sum', 'value') == float(sum(range(0, 1000, 2)) + sum(range(1, 400, 2)))
+
+
+@pytest.mark.parametrize("func, field", [("sum", "name"), ("avg", "flag"), ("sum", "missing")])
+def test_sum_and_avg_reject_non_numeric_fields(manager, func, field):
+    schema = {"id": int, "name": str, "flag": bool}
+    manager.create_table("db", "plain", schema, search_key="id")
+    manager.create_table("db", "split", schema, search_key="id",
+                         partitioning={"boundaries": [50], "executor": "thread"})
+    for name in ("plain", "split"):
+        table = manager.get_table("db", name)
+        table.insert_many({"id": i, "name": str(i), "flag": i % 2 == 0} for i in range(100))
+        with pytest.raises(ValueError):
+            table.aggregate(func, field)
+        assert table.aggregate("max", "name") == "99"
+        assert table.aggregate("count", None, 10, 19) == 10
@@ -0,0 +1,204 @@
+import contextlib
+import io
+import os
+import sys
+import threading
+
+import pytest
+
+from database import replication
+from database.db_manager import DatabaseManager
+from database.replication import Follower, ReplicationLog, _list_segments, _read_entries
+
+SCHEMA = {"id": int, "name": str}
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    # Every mutation prints a success message; keep test output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@pytest.fixture
+def fast_switching():
+    # Switch threads as often as possible so unsynchronized sections interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def make_leader(tmp_path, snapshot_every=10000):
+    leader = DatabaseManager(str(tmp_path / "leader.pkl"))
+    log = ReplicationLog(str(tmp_path / "log"), snapshot_every=snapshot_every)
+    leader.enable_replication(log)
+    leader.create_database("db")
+    for name in ("a", "b"):
+        leader.create_table("db", name, SCHEMA, order=8, search_key="id")
+    return leader, log
+
+
+def make_follower(tmp_path):
+    return Follower(DatabaseManager(str(tmp_path / "follower.pkl")), str(tmp_path / "log"))
+
+
+def table_contents(manager):
+    return {name: manager.get_table("db", name).get_all() for name in ("a", "b")}
+
+
+def insert_rows(manager, table_name, count):
+    table = manager.get_table("db", table_name)
+    for i in range(count):
+        table.insert({"id": i, "name": f"{table_name}{i}"})
+
+
+def write_concurrently(leader, count):
+    threads = [threading.Thread(target=insert_rows, args=(leader, name, count)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_log_is_in_seq_order_under_concurrent_writers(tmp_path, fast_switching):
+    leader, log = make_leader(tmp_path)
+    write_concurrently(leader, 500)
+
+    seqs = [entry["seq"] for _, path in _list_segments(log.directory) for entry, _ in _read_entries(path)]
+    assert seqs == list(range(seqs[0], seqs[0] + len(seqs)))
+    assert seqs[-1] == log.seq
+
+    follower = make_follower(tmp_path)
+    follower.catch_up_from_snapshot()
+    follower.poll()
+    assert follower.last_error is None
+    assert table_contents(follower.manager) == table_contents(leader)
+
+
+def test_follower_polling_during_concurrent_writes_and_snapshots(tmp_path, fast_switching):
+    leader, log = make_leader(tmp_path, snapshot_every=97)
+    follower = make_follower(tmp_path)
+    follower.catch_up_from_snapshot()
+
+    done = threading.Event()
+
+    def poll_until_done():
+        while not done.is_set():
+            follower.poll()
+
+    poller = threading.Thread(target=poll_until_done)
+    poller.start()
+    write_concurrently(leader, 400)
+    done.set()
+    poller.join()
+    follower.poll()
+
+    assert follower.resyncs == 0, follower.last_error
+    assert follower.applied_seq == log.seq
+    assert table_contents(follower.manager) == table_contents(leader)
+
+
+def test_snapshots_taken_during_concurrent_writes_match_the_log(tmp_path, fast_switching):
+    leader, log = make_leader(tmp_path, snapshot_every=3)
+    follower = make_follower(tmp_path)
+    done = threading.Event()
+
+    def restore_and_replay():
+        # Replaying after a restore fails if a snapshot holds a write logged after its seq
+        while not done.is_set():
+            follower.catch_up_from_snapshot()
+            follower.poll()
+
+    restorer = threading.Thread(target=restore_and_replay)
+    restorer.start()
+    write_concurrently(leader, 200)
+    done.set()
+    restorer.join()
+    follower.poll()
+
+    assert follower.resyncs == 0, follower.last_error
+    assert table_contents(follower.manager) == table_contents(leader)
+
+
+def test_diverged_follower_restores_snapshot(tmp_path):
+    leader, log = make_leader(tmp_path)
+    follower = make_follower(tmp_path)
+    follower.catch_up_from_snapshot()
+    follower.poll()
+
+    # A local write the leader never made; replaying the leader's insert of key 1 fails
+    follower.manager.get_table("db", "a").insert({"id": 1, "name": "stray"})
+    insert_rows(leader, "a", 3)
+    follower.poll()
+
+    assert follower.resyncs == 1
+    assert follower.status()["last_error"]["seq"] == 5  # Entries 1-3 are DDL, 4 inserts key 0
+    log.write_snapshot()
+    follower.poll()
+    assert table_contents(follower.manager) == table_contents(leader)
+
+
+def test_gap_in_log_triggers_snapshot_restore(tmp_path):
+    leader, log = make_leader(tmp_path)
+    follower = make_follower(tmp_path)
+    follower.catch_up_from_snapshot()
+    insert_rows(leader, "a", 5)
+
+    segment = _list_segments(log.directory)[-1][1]
+    with open(segment) as f:
+        lines = f.readlines()
+    with open(segment, 'w') as f:
+        f.writelines(lines[:4] + lines[5:])  # Drop seq 5
+
+    follower.poll()
+    assert follower.resyncs == 1
+    assert "gap" in follower.last_error["error"]
+
+
+def test_lagging_follower_ignores_older_snapshot(tmp_path, monkeypatch):
+    leader, log = make_leader(tmp_path, snapshot_every=1000)
+    follower = make_follower(tmp_path)
+    follower.max_lag = 50
+    follower.catch_up_from_snapshot()
+    restores = []
+    monkeypatch.setattr(replication, "restore_snapshot", lambda *args: restores.append(args))
+
+    for round_number in range(10):
+        table = leader.get_table("db", "a")
+        for i in range(60):
+            key = round_number * 60 + i
+            table.insert({"id": key, "name": str(key)})
+        follower.poll()
+
+    assert follower.applied_seq == log.seq
+    assert not restores
+    assert table_contents(follower.manager) == table_contents(leader)
+
+
+def test_snapshot_restore_swaps_in_complete_state(tmp_path, monkeypatch):
+    leader, log = make_leader(tmp_path)
+    leader.create_table("db", "events", SCHEMA, search_key="id", engine="lsm")
+    insert_rows(leader, "a", 50)
+    for i in range(50):
+        leader.get_table("db", "events").insert({"id": i, "name": str(i)})
+    log.write_snapshot()
+
+    follower = make_follower(tmp_path)
+    follower.catch_up_from_snapshot()
+    old_events = follower.manager.get_table("db", "events")
+    seen = []
+    replace_databases = follower.manager.replace_databases
+
+    def check_before_swap(databases):
+        # Until the swap, readers still see the previous, complete state
+        seen.append(len(follower.manager.get_table("db", "a").get_all()))
+        replace_databases(databases)
+
+    monkeypatch.setattr(follower.manager, "replace_databases", check_before_swap)
+    follower.catch_up_from_snapshot()
+
+    assert seen == [50]
+    assert follower.manager.get_table("db", "events") is not old_events
+    assert len(follower.manager.get_table("db", "events").get_all()) == 50
+    assert not os.path.exists(old_events.data.directory)